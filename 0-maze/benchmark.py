@@ -0,0 +1,180 @@
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+
+from maze import (Maze, CompactMaze, SearchStats, StackFrontier, QueueFrontier,
+                  IndexedStackFrontier, IndexedQueueFrontier,
+                  manhattan, euclidean)
+
+# Name, solver and the largest maze (in cells) it is run on, if limited
+SOLVERS = [
+    ("stack", lambda m: m.solve(frontier_class=StackFrontier), 50000),
+    ("indexed stack", lambda m: m.solve(frontier_class=IndexedStackFrontier), None),
+    ("queue", lambda m: m.solve(frontier_class=QueueFrontier), 50000),
+    ("indexed queue", lambda m: m.solve(frontier_class=IndexedQueueFrontier), None),
+    ("astar manhattan", lambda m: m.solve_astar(manhattan), None),
+    ("astar euclidean", lambda m: m.solve_astar(euclidean), None),
+    ("greedy", lambda m: m.solve_greedy(manhattan), None),
+    ("bidirectional", lambda m: m.solve_bidirectional(), None),
+    ("jps", lambda m: m.solve_jps(manhattan), None),
+    ("ida", lambda m: m.solve_ida(manhattan), 20000),
+    ("frontier", lambda m: m.solve_frontier(), None),
+]
+
+BACKENDS = {
+    "maze": Maze,
+    "compact": CompactMaze,
+}
+
+
+def generate_maze(height, width, seed=0, loops=0.1):
+    """
+    Returns the text of a random maze of the given size.
+
+    Carves a perfect maze with a randomized depth-first search, then
+    knocks down a fraction `loops` of the remaining inner walls so that
+    the maze has cycles and open areas. The start is placed in the top
+    left corner and the goal in the bottom right, and there is always
+    a path between them.
+    """
+    rng = random.Random(seed)
+    height = max(3, height | 1)
+    width = max(3, width | 1)
+    grid = [["#"] * width for _ in range(height)]
+
+    # Carve passages between odd cells
+    grid[1][1] = " "
+    stack = [(1, 1)]
+    while stack:
+        row, col = stack[-1]
+        candidates = []
+        for dr, dc in ((-2, 0), (2, 0), (0, -2), (0, 2)):
+            r, c = row + dr, col + dc
+            if 0 < r < height - 1 and 0 < c < width - 1 and grid[r][c] == "#":
+                candidates.append((r, c))
+        if not candidates:
+            stack.pop()
+            continue
+        r, c = rng.choice(candidates)
+        grid[(row + r) // 2][(col + c) // 2] = " "
+        grid[r][c] = " "
+        stack.append((r, c))
+
+    # Open up some extra walls to create loops
+    for row in range(1, height - 1):
+        for col in range(1, width - 1):
+            if grid[row][col] == "#" and rng.random() < loops:
+                grid[row][col] = " "
+
+    grid[1][1] = "A"
+    grid[height - 2][width - 2] = "B"
+    return "\n".join("".join(row) for row in grid) + "\n"
+
+
+def write_maze(height, width, seed=0, loops=0.1):
+    """
+    Writes a generated maze to a temporary file and returns its path.
+    """
+    fd, path = tempfile.mkstemp(suffix=".txt", prefix="maze")
+    with os.fdopen(fd, "w") as f:
+        f.write(generate_maze(height, width, seed, loops))
+    return path
+
+
+def run(maze, solve, measure_memory=False):
+    """
+    Runs `solve` on `maze` and returns its SearchStats as a dict, along
+    with the solution length.
+    """
+    maze.stats = SearchStats(measure_memory=measure_memory)
+    solve(maze)
+    return {"length": len(maze.solution[0]), **maze.stats.as_dict()}
+
+
+def benchmark(sizes, seeds, loops, backends, solvers, measure_memory=False):
+    """
+    Runs every solver on a generated maze for each combination of size,
+    seed and loop density, and yields one report row per run. With
+    `measure_memory`, every solver is run a second time with memory
+    tracing so that tracing does not distort the timings.
+    """
+    for size in sizes:
+        for density in loops:
+            for seed in seeds:
+                path = write_maze(size, size, seed, density)
+                try:
+                    mazes = [(name, BACKENDS[name](path)) for name in backends]
+                finally:
+                    os.remove(path)
+                for backend, maze in mazes:
+                    cells = maze.height * maze.width
+                    for name, solve, max_cells in solvers:
+                        if max_cells is not None and cells > max_cells:
+                            continue
+                        row = {
+                            "size": size, "loops": density, "seed": seed,
+                            "backend": backend, "solver": name,
+                            **run(maze, solve)
+                        }
+                        if measure_memory:
+                            row["peak_memory"] = run(maze, solve, True)["peak_memory"]
+                        yield row
+
+
+def write_report(rows, filename):
+    """
+    Writes report rows to `filename` as JSON if it ends in .json and as
+    CSV otherwise.
+    """
+    if filename.endswith(".json"):
+        with open(filename, "w") as f:
+            json.dump(rows, f, indent=2)
+        return
+    fields = []
+    for row in rows:
+        fields.extend(field for field in row if field not in fields)
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maze solvers on generated mazes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101, 201],
+                        help="maze side lengths (default: 51 101 201)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0],
+                        help="random seeds (default: 0)")
+    parser.add_argument("--loops", type=float, nargs="+", default=[0.1, 0.6],
+                        help="fraction of extra walls knocked down (default: 0.1 0.6)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["maze"],
+                        help="maze backends to run (default: maze)")
+    parser.add_argument("--solvers", nargs="+", choices=[name for name, _, _ in SOLVERS],
+                        help="solvers to run (default: all)")
+    parser.add_argument("--memory", action="store_true",
+                        help="also measure peak memory of every run")
+    parser.add_argument("--output", help="write the report to this .csv or .json file")
+    args = parser.parse_args()
+
+    solvers = [solver for solver in SOLVERS if args.solvers is None or solver[0] in args.solvers]
+
+    print(f"{'size':>6} {'loops':>5} {'seed':>4} {'backend':<8} {'solver':<16} "
+          f"{'expanded':>9} {'generated':>9} {'peak':>7} {'length':>7} {'seconds':>9}")
+    rows = []
+    for row in benchmark(args.sizes, args.seeds, args.loops, args.backends,
+                         solvers, args.memory):
+        rows.append(row)
+        print(f"{row['size']:>6} {row['loops']:>5} {row['seed']:>4} {row['backend']:<8} "
+              f"{row['solver']:<16} {row['expanded']:>9} {row['generated']:>9} "
+              f"{row['frontier_peak']:>7} {row['length']:>7} {row['total_seconds']:>9.4f}")
+
+    if args.output:
+        write_report(rows, args.output)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
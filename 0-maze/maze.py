@@ -1,10 +1,23 @@
-import sys
+import argparse
+import functools
+import heapq
+import math
+import mmap
+import os
+import re
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from itertools import count
 
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
@@ -39,6 +52,243 @@ class QueueFrontier(StackFrontier):
             self.frontier = self.frontier[1:]
             return node
 
+
+class IndexedStackFrontier():
+    """
+    Stack frontier with constant-time add, remove and membership checks.
+
+    Keeps a count of every state in the frontier alongside the nodes,
+    so contains_state never has to scan them.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.pop()
+            copies = self.states[node.state]
+            if copies == 1:
+                del self.states[node.state]
+            else:
+                self.states[node.state] = copies - 1
+            return node
+
+    def pop(self):
+        return self.frontier.pop()
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier():
+    """
+    Frontier that always removes the node with the lowest priority.
+
+    `priority` is called with each node as it is added. Adding a node for
+    a state already in the frontier replaces the old node, which is then
+    skipped lazily when it reaches the top of the heap.
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.frontier = []
+        self.nodes = {}
+        self.counter = count()
+
+    def add(self, node):
+        self.nodes[node.state] = node
+        heapq.heappush(
+            self.frontier, (self.priority(node), next(self.counter), node)
+        )
+
+    def contains_state(self, state):
+        return state in self.nodes
+
+    def get(self, state):
+        return self.nodes.get(state)
+
+    def empty(self):
+        return len(self.nodes) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        while True:
+            node = heapq.heappop(self.frontier)[2]
+            if self.nodes.get(node.state) is node:
+                del self.nodes[node.state]
+                return node
+
+
+class MemoryBudget():
+    """
+    Context manager that measures the memory a search allocates with
+    tracemalloc. check() raises an exception once more than `limit` bytes
+    are in use, and over() tells whether a share of the limit is; `peak`
+    holds the highest usage seen after the block ends.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.peak = 0
+
+    def __enter__(self):
+        self.tracing = tracemalloc.is_tracing()
+        if not self.tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        self.peak = tracemalloc.get_traced_memory()[1] - self.base
+        if not self.tracing:
+            tracemalloc.stop()
+
+    def over(self, share=1.0):
+        if self.limit is None:
+            return False
+        return tracemalloc.get_traced_memory()[0] - self.base > self.limit * share
+
+    def check(self):
+        if self.over():
+            raise Exception("memory limit exceeded")
+
+
+class SearchStats():
+    """
+    Counters and hooks filled in by every Maze solver.
+
+    `on_expand` and `on_generate` are called with each state as it is
+    expanded or put on the frontier. Duplicates count states that were
+    reached again and dropped. `phases` maps phase names to seconds:
+    "total" for the whole solve and "reconstruct" for building the
+    solution. If `measure_memory` is set, each solve also records its
+    peak memory in bytes, at the cost of tracing every allocation.
+    """
+
+    def __init__(self, on_expand=None, on_generate=None, measure_memory=False):
+        self.on_expand = on_expand
+        self.on_generate = on_generate
+        self.measure_memory = measure_memory
+        self.reset()
+
+    def reset(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.frontier_peak = 0
+        self.phases = {}
+        self.peak_memory = None
+
+    def expand(self, state):
+        self.expanded += 1
+        if self.on_expand is not None:
+            self.on_expand(state)
+
+    def generate(self, state, frontier_size):
+        self.generated += 1
+        if frontier_size > self.frontier_peak:
+            self.frontier_peak = frontier_size
+        if self.on_generate is not None:
+            self.on_generate(state)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "frontier_peak": self.frontier_peak,
+            "peak_memory": self.peak_memory,
+            **{f"{name}_seconds": seconds for name, seconds in self.phases.items()},
+        }
+
+
+def instrumented(solve):
+    """
+    Decorator for Maze solvers: resets the maze's stats, times the whole
+    solve as the "total" phase and measures peak memory if asked to.
+    """
+    @functools.wraps(solve)
+    def wrapper(self, *args, **kwargs):
+        stats = self.stats
+        stats.reset()
+        budget = MemoryBudget() if stats.measure_memory else None
+        try:
+            with stats.phase("total"):
+                if budget is None:
+                    return solve(self, *args, **kwargs)
+                with budget:
+                    return solve(self, *args, **kwargs)
+        finally:
+            if budget is not None:
+                stats.peak_memory = max(budget.peak, stats.peak_memory or 0)
+            self.solve_time = stats.phases["total"]
+    return wrapper
+
+
+def manhattan(state, goal):
+    """
+    Returns the Manhattan distance between two cells.
+    """
+    return abs(state[0] - goal[0]) + abs(state[1] - goal[1])
+
+
+def euclidean(state, goal):
+    """
+    Returns the straight-line distance between two cells.
+    """
+    return math.hypot(state[0] - goal[0], state[1] - goal[1])
+
+
+# Row and column offsets for each action
+DIRECTIONS = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+# Action that undoes each action
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+# Cell colours for output_image, indexed by the constants below
+PALETTE = [
+    (237, 240, 252, 255),
+    (212, 97, 85, 255),
+    (220, 235, 113, 255),
+    (0, 171, 28, 255),
+    (255, 0, 0, 255),
+    (40, 40, 40, 255),
+]
+EMPTY, EXPLORED, SOLUTION, GOAL, START, WALL = range(6)
+
+HEURISTICS = {
+    "manhattan": manhattan,
+    "euclidean": euclidean,
+}
+
+
 class Maze():
 
     def __init__(self, filename):
@@ -79,6 +329,17 @@ class Maze():
             self.walls.append(row)
 
         self.solution = None
+        self.stats = SearchStats()
+
+
+    @property
+    def num_explored(self):
+        return self.stats.expanded
+
+
+    @property
+    def num_generated(self):
+        return self.stats.generated
 
 
     def print(self):
@@ -116,16 +377,18 @@ class Maze():
         return result
 
 
-    def solve(self):
+    @instrumented
+    def solve(self, frontier_class=IndexedStackFrontier):
         """Finds a solution to maze, if one exists."""
 
-        # Keep track of number of states explored
-        self.num_explored = 0
+        # Keep track of the states explored and generated
+        stats = self.stats
 
         # Initialize frontier to just the starting position
         start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
+        frontier = frontier_class()
         frontier.add(start)
+        stats.generate(self.start, 1)
 
         # Initialize an empty explored set
         self.explored = set()
@@ -139,19 +402,12 @@ class Maze():
 
             # Choose a node from the frontier
             node = frontier.remove()
-            self.num_explored += 1
+            stats.expand(node.state)
 
             # If node is the goal, then we have a solution
             if node.state == self.goal:
-                actions = []
-                cells = []
-                while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
-                    node = node.parent
-                actions.reverse()
-                cells.reverse()
-                self.solution = (actions, cells)
+                with stats.phase("reconstruct"):
+                    self.solution = self.backtrack(node)
                 return
 
             # Mark node as explored
@@ -162,68 +418,859 @@ class Maze():
                 if not frontier.contains_state(state) and state not in self.explored:
                     child = Node(state=state, parent=node, action=action)
                     frontier.add(child)
+                    stats.generate(state, len(frontier.frontier))
+                else:
+                    stats.duplicates += 1
 
 
-    def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
+    @instrumented
+    def solve_astar(self, heuristic=manhattan):
+        """
+        Finds an optimal solution with A* search.
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
+        `heuristic` is called as heuristic(state, goal) and must never
+        overestimate the remaining distance for the path to be optimal.
+        """
+        goal = self.goal
+        self.best_first(
+            lambda node: (node.cost + heuristic(node.state, goal),
+                          -node.cost)
         )
-        draw = ImageDraw.Draw(img)
 
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
 
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
+    @instrumented
+    def solve_greedy(self, heuristic=manhattan):
+        """
+        Finds a solution with greedy best-first search, which always
+        expands the node that looks closest to the goal. Fast, but the
+        path is not guaranteed to be the shortest.
+        """
+        goal = self.goal
+        self.best_first(lambda node: heuristic(node.state, goal))
 
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
 
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
+    def best_first(self, priority, successors=None):
+        """
+        Searches the maze, always expanding the frontier node with the
+        lowest priority, and keeps the cheapest known path to each state.
 
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
+        `successors` is called with each expanded node and yields
+        (action, state, step cost) triples; by default it is every
+        neighbor at a cost of 1.
+        """
+        stats = self.stats
+        start = Node(state=self.start, parent=None, action=None)
+        frontier = PriorityFrontier(priority)
+        frontier.add(start)
+        stats.generate(self.start, 1)
+        self.explored = set()
 
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
+        while True:
+            if frontier.empty():
+                raise Exception("no solution")
+
+            node = frontier.remove()
+            stats.expand(node.state)
 
-                # Empty cell
+            if node.state == self.goal:
+                with stats.phase("reconstruct"):
+                    self.solution = self.backtrack(node)
+                return
+
+            self.explored.add(node.state)
+
+            if successors is None:
+                children = ((action, state, 1) for action, state in self.neighbors(node.state))
+            else:
+                children = successors(node)
+            for action, state, step in children:
+                if state in self.explored:
+                    stats.duplicates += 1
+                    continue
+                cost = node.cost + step
+                queued = frontier.get(state)
+                if queued is None or cost < queued.cost:
+                    frontier.add(Node(state=state, parent=node, action=action, cost=cost))
+                    stats.generate(state, len(frontier.nodes))
                 else:
-                    fill = (237, 240, 252)
-
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
-
-        img.save(filename)
-
-
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+                    stats.duplicates += 1
+
+
+    @instrumented
+    def solve_jps(self, heuristic=manhattan):
+        """
+        Finds an optimal solution with Jump Point Search.
+
+        Runs A* over jump points only: straight moves are followed until
+        something forces a turn, so the many equally short paths through
+        open areas are never put on the frontier. Among equal paths the
+        search prefers horizontal moves first, which means vertical runs
+        only stop where a wall beside them has just ended, and horizontal
+        runs stop wherever a vertical run leads somewhere useful.
+        """
+        goal = self.goal
+        self.best_first(
+            lambda node: (node.cost + heuristic(node.state, goal),
+                          -node.cost),
+            self.jump_successors
+        )
+
+        # Break every jump up into single steps
+        with self.stats.phase("reconstruct"):
+            actions = []
+            cells = []
+            state = self.start
+            for action, target in zip(*self.solution):
+                dr, dc = DIRECTIONS[action]
+                while state != target:
+                    state = (state[0] + dr, state[1] + dc)
+                    actions.append(action)
+                    cells.append(state)
+            self.solution = (actions, cells)
+
+
+    def jump_successors(self, node):
+        """
+        Yields (direction, jump point, distance) for every jump point
+        reachable from `node` after pruning symmetric directions.
+        """
+        row, col = node.state
+        if node.action is None:
+            directions = list(DIRECTIONS)
+        elif node.action in ("left", "right"):
+            directions = [node.action, "up", "down"]
+        else:
+            directions = [node.action]
+            previous = row - DIRECTIONS[node.action][0]
+            for side, direction in ((-1, "left"), (1, "right")):
+                if self.passable(row, col + side) and not self.passable(previous, col + side):
+                    directions.append(direction)
+
+        for direction in directions:
+            target = self.jump(node.state, direction)
+            if target is not None:
+                yield direction, target, manhattan(node.state, target)
+
+
+    def jump(self, state, direction):
+        """
+        Moves from `state` in `direction` until reaching the goal or a
+        jump point, and returns that cell, or None if a wall comes first.
+        """
+        dr, dc = DIRECTIONS[direction]
+        row, col = state
+        while True:
+            previous = row
+            row += dr
+            col += dc
+            if not self.passable(row, col):
+                return None
+            if (row, col) == self.goal:
+                return (row, col)
+            if dr:
+                # Vertical runs stop next to a gap that opens up after a wall
+                for side in (-1, 1):
+                    if self.passable(row, col + side) and not self.passable(previous, col + side):
+                        return (row, col)
+            elif (self.jump((row, col), "up") is not None
+                    or self.jump((row, col), "down") is not None):
+                return (row, col)
+
+
+    def passable(self, row, col):
+        """
+        Returns True if (row, col) is inside the maze and not a wall.
+        """
+        return 0 <= row < self.height and 0 <= col < self.width and not self.is_wall(row, col)
+
+
+    def is_wall(self, row, col):
+        return self.walls[row][col]
+
+
+    @instrumented
+    def solve_bidirectional(self):
+        """
+        Finds a shortest solution with bidirectional breadth-first search.
+
+        Searches forward from the start and backward from the goal at the
+        same time, always expanding a whole layer of the smaller side,
+        until the two searches meet.
+        """
+        self.explored = set()
+        self.stats.generate(self.start, 1)
+        self.stats.generate(self.goal, 2)
+
+        # Map each reached state to (previous state, action, depth)
+        forward = {self.start: (None, None, 0)}
+        backward = {self.goal: (None, None, 0)}
+        forward_layer = [self.start]
+        backward_layer = [self.goal]
+        meet = self.start if self.start == self.goal else None
+
+        while meet is None:
+            if not forward_layer or not backward_layer:
+                raise Exception("no solution")
+            if len(forward_layer) <= len(backward_layer):
+                forward_layer, meet = self.expand_layer(forward_layer, forward, backward)
+            else:
+                backward_layer, meet = self.expand_layer(backward_layer, backward, forward)
+
+        # Walk back to the start, then forward to the goal
+        with self.stats.phase("reconstruct"):
+            actions = []
+            cells = []
+            state = meet
+            while forward[state][0] is not None:
+                previous, action, _ = forward[state]
+                actions.append(action)
+                cells.append(state)
+                state = previous
+            actions.reverse()
+            cells.reverse()
+            state = meet
+            while backward[state][0] is not None:
+                following, action, _ = backward[state]
+                actions.append(OPPOSITE[action])
+                cells.append(following)
+                state = following
+            self.solution = (actions, cells)
+
+
+    def expand_layer(self, layer, reached, other):
+        """
+        Expands every state in `layer` for one side of a bidirectional
+        search. Returns the next layer and the state in it closest to the
+        other side's origin, if any of it has been reached from there.
+        """
+        stats = self.stats
+        next_layer = []
+        meet = None
+        for state in layer:
+            stats.expand(state)
+            self.explored.add(state)
+            depth = reached[state][2] + 1
+            for action, neighbor in self.neighbors(state):
+                if neighbor in reached:
+                    stats.duplicates += 1
+                    continue
+                reached[neighbor] = (state, action, depth)
+                next_layer.append(neighbor)
+                stats.generate(neighbor, len(layer) + len(next_layer))
+                if neighbor in other and (meet is None or other[neighbor][2] < other[meet][2]):
+                    meet = neighbor
+        return next_layer, meet
+
+
+    @instrumented
+    def solve_ida(self, heuristic=manhattan, memory_limit=None, table_size=1 << 16):
+        """
+        Finds an optimal solution with iterative-deepening A*.
+
+        Runs depth-first searches that give up on any path whose cost plus
+        heuristic exceeds a bound, raising the bound to the smallest value
+        that was cut off until the goal is reached. Besides the current
+        path, each iteration remembers the cheapest cost it has reached up
+        to `table_size` states with, and does not search them again from a
+        costlier path. The table also stops growing once it has used three
+        quarters of `memory_limit`, leaving the rest for the path, and is
+        emptied and halved if the path needs more, so a tight limit makes
+        the search slower rather than failing it unless the path alone
+        does not fit. Memory is bounded by the table and the solution
+        length rather than the maze, at the price of re-expanding states;
+        once the table is full, mazes with many loops can take
+        exponentially long.
+        """
+        stats = self.stats
+        self.explored = set()
+        goal = self.goal
+        stats.generate(self.start, 1)
+
+        with MemoryBudget(memory_limit) as budget:
+            bound = heuristic(self.start, goal)
+            while True:
+                # Each stack entry is a state on the path and its untried moves
+                path = {self.start}
+                table = {self.start: 0}
+                actions = []
+                stack = [(self.start, iter(self.ordered_neighbors(self.start, heuristic)))]
+                cutoff = math.inf
+                found = self.start == goal
+                stats.expand(self.start)
+
+                while stack and not found:
+                    state, moves = stack[-1]
+                    for action, neighbor in moves:
+                        if neighbor in path:
+                            continue
+                        cost = len(actions) + 1
+                        if table.get(neighbor, math.inf) <= cost:
+                            stats.duplicates += 1
+                            continue
+                        if neighbor not in table and len(table) < table_size and budget.over(0.75):
+                            table_size = len(table)
+                        if neighbor in table or len(table) < table_size:
+                            table[neighbor] = cost
+                        stats.generate(neighbor, len(stack))
+                        f = cost + heuristic(neighbor, goal)
+                        if f > bound:
+                            cutoff = min(cutoff, f)
+                            continue
+                        actions.append(action)
+                        path.add(neighbor)
+                        if neighbor == goal:
+                            found = True
+                            break
+                        stats.expand(neighbor)
+                        stack.append((neighbor, iter(self.ordered_neighbors(neighbor, heuristic))))
+                        if budget.over() and len(table) > 1:
+                            # Give the table's memory to the path and keep a smaller one from now on
+                            table_size = len(table) // 2
+                            table = {self.start: 0}
+                        budget.check()
+                        break
+                    else:
+                        stack.pop()
+                        path.discard(state)
+                        if actions:
+                            actions.pop()
+
+                if found:
+                    break
+                if cutoff == math.inf:
+                    raise Exception("no solution")
+                bound = cutoff
+
+            self.solution = (actions, self.walk(self.start, actions))
+
+        stats.peak_memory = budget.peak
+
+
+    def ordered_neighbors(self, state, heuristic):
+        """
+        Returns the neighbors of `state`, most promising first.
+        """
+        return sorted(self.neighbors(state), key=lambda move: heuristic(move[1], self.goal))
+
+
+    @instrumented
+    def solve_frontier(self, memory_limit=None):
+        """
+        Finds a shortest solution with divide-and-conquer frontier search.
+
+        A bidirectional breadth-first search that only keeps the last two
+        layers of each side: in an undirected maze, the next layer is the
+        neighbors of the current layer that are not in it or the layer
+        before. That is enough to find a cell in the middle of a shortest
+        path but not the path itself, so the halves on either side of it
+        are solved the same way until they are single steps. Memory grows
+        with the width of the layers instead of the number of cells.
+        """
+        stats = self.stats
+        self.explored = set()
+        stats.generate(self.start, 1)
+
+        with MemoryBudget(memory_limit) as budget:
+            cells = []
+            distance = self.meet_in_middle(self.start, self.goal, budget)[1]
+            segments = [(self.start, self.goal, distance)]
+
+            # Split segments depth first, left half on top of the stack
+            while segments:
+                a, b, distance = segments.pop()
+                if distance == 0:
+                    continue
+                if distance == 1:
+                    cells.append(b)
+                    continue
+                middle, _, to_middle = self.meet_in_middle(a, b, budget)
+                segments.append((middle, b, distance - to_middle))
+                segments.append((a, middle, to_middle))
+
+            with stats.phase("reconstruct"):
+                actions = []
+                previous = self.start
+                for cell in cells:
+                    for action, neighbor in self.neighbors(previous):
+                        if neighbor == cell:
+                            actions.append(action)
+                            break
+                    previous = cell
+                self.solution = (actions, cells)
+
+        stats.peak_memory = budget.peak
+
+
+    def meet_in_middle(self, a, b, budget):
+        """
+        Runs a frontier-only bidirectional breadth-first search between
+        `a` and `b`. Returns a cell on a shortest path, the length of that
+        path and the distance from `a` to the cell.
+        """
+        if a == b:
+            return a, 0, 0
+        stats = self.stats
+
+        # For each side: [previous layer, current layer, depth]
+        sides = [[set(), {a}, 0], [set(), {b}, 0]]
+        while True:
+            if not sides[0][1] or not sides[1][1]:
+                raise Exception("no solution")
+            # Keep the depths level so the meeting cell splits the path
+            side = 0 if (sides[0][2], len(sides[0][1])) <= (sides[1][2], len(sides[1][1])) else 1
+            previous, layer, depth = sides[side]
+            _, other_layer, other_depth = sides[1 - side]
+
+            next_layer = set()
+            for state in layer:
+                stats.expand(state)
+                for _, neighbor in self.neighbors(state):
+                    if neighbor in layer or neighbor in previous or neighbor in next_layer:
+                        stats.duplicates += 1
+                        continue
+                    next_layer.add(neighbor)
+                    stats.generate(neighbor, len(previous) + len(layer) + len(next_layer))
+            sides[side] = [layer, next_layer, depth + 1]
+            budget.check()
+
+            # The first cells both sides reach lie on shortest paths
+            meeting = next_layer & other_layer
+            if meeting:
+                middle = next(iter(meeting))
+                distance = depth + 1 + other_depth
+                return middle, distance, depth + 1 if side == 0 else other_depth
+
+
+    def walk(self, start, actions):
+        """
+        Returns the cells visited by taking `actions` from `start`.
+        """
+        cells = []
+        row, col = start
+        for action in actions:
+            dr, dc = DIRECTIONS[action]
+            row, col = row + dr, col + dc
+            cells.append((row, col))
+        return cells
+
+
+    def backtrack(self, node):
+        """
+        Returns the (actions, cells) solution that leads to `node`.
+        """
+        actions = []
+        cells = []
+        while node.parent is not None:
+            actions.append(node.action)
+            cells.append(node.state)
+            node = node.parent
+        actions.reverse()
+        cells.reverse()
+        return (actions, cells)
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False,
+                     cell_size=50, tile_size=None):
+        """
+        Draws the maze, and the solution if there is one, to `filename`.
+
+        The picture is built with NumPy: every cell gets an index into
+        PALETTE, the indices are looked up all at once and written into
+        the inside of every cell's square in one strided assignment. If
+        `tile_size` is given, the picture is written as tiles of at most
+        tile_size x tile_size cells, named <name>-<row>-<col><ext>, so a
+        very large maze never has to be held in memory as one image.
+        """
+        import numpy as np
+        from PIL import Image
+        cell_border = cell_size // 25
+
+        # Colour every cell, lowest priority first
+        cells = np.zeros((self.height, self.width), dtype=np.uint8)
+        if self.solution is not None and show_explored:
+            cells[self.explored_mask()] = EXPLORED
+        if self.solution is not None and show_solution and self.solution[1]:
+            rows, cols = zip(*self.solution[1])
+            cells[list(rows), list(cols)] = SOLUTION
+        cells[self.goal] = GOAL
+        cells[self.start] = START
+        cells[self.wall_mask()] = WALL
+
+        palette = np.array(PALETTE, dtype=np.uint8)
+        inside = slice(cell_border, cell_size - cell_border + 1)
+
+        def draw(block):
+            height, width = block.shape
+            pixels = np.zeros((height, cell_size, width, cell_size, 4), dtype=np.uint8)
+            pixels[..., 3] = 255
+            pixels[:, inside, :, inside] = palette[block][:, None, :, None]
+            return Image.fromarray(
+                pixels.reshape(height * cell_size, width * cell_size, 4), "RGBA"
+            )
+
+        if tile_size is None:
+            draw(cells).save(filename)
+            return
+
+        name, ext = os.path.splitext(filename)
+        for i in range(0, self.height, tile_size):
+            for j in range(0, self.width, tile_size):
+                tile = draw(cells[i:i + tile_size, j:j + tile_size])
+                tile.save(f"{name}-{i // tile_size}-{j // tile_size}{ext}")
+
+
+    def wall_mask(self):
+        """
+        Returns the walls as a NumPy array of bools.
+        """
+        import numpy as np
+        return np.array(self.walls, dtype=bool).reshape(self.height, self.width)
+
+
+    def explored_mask(self):
+        """
+        Returns the explored cells as a NumPy array of bools.
+        """
+        import numpy as np
+        if isinstance(self.explored, CellSet):
+            return self.explored.mask(self.height, self.width)
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        if self.explored:
+            rows, cols = zip(*self.explored)
+            mask[list(rows), list(cols)] = True
+        return mask
+
+
+# Maps every byte of a maze row to ASCII "1" for a wall and "0" for open space
+WALL_BYTES = bytes(48 if chr(b) in " AB" else 49 for b in range(256))
+WALL_CHARS = re.compile("[^ AB]")
+
+# Actions in the order Maze.neighbors produces them, as 2-bit codes
+ACTIONS = ("up", "down", "left", "right")
+
+
+def pack_row(line, stride):
+    """
+    Returns the walls of one line of a maze file as `stride` bytes,
+    with one bit per cell and the leftmost cell in the lowest bit.
+    `line` may be str or ASCII bytes.
+    """
+    if isinstance(line, str) and line.isascii():
+        line = line.encode("ascii")
+    if isinstance(line, bytes):
+        bits = line.translate(WALL_BYTES)
+    else:
+        bits = WALL_CHARS.sub("1", line).replace(" ", "0").replace("A", "0").replace("B", "0")
+    if not bits:
+        return bytes(stride)
+    return int(bits[::-1], 2).to_bytes(stride, "little")
+
+
+def load_walls(filename):
+    """
+    Streams a maze file into a packed wall buffer in a single pass.
+
+    The file is memory-mapped and read one line at a time, so only the
+    packed walls (one bit per cell) are ever held in memory. Rows are
+    padded to `stride` bytes; the stride grows if a later line turns out
+    to be wider than all the lines before it.
+
+    Returns (wall_bits, height, width, stride, start, goal).
+    """
+    wall_bits = bytearray()
+    height = width = stride = 0
+    starts = []
+    goals = []
+
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise Exception("maze must have exactly one start point")
+
+        with data:
+            for line in iter(data.readline, b""):
+                line = line.rstrip(b"\r\n")
+                if not line.isascii():
+                    line = line.decode("utf-8")
+
+                # Widen every row packed so far if this line is wider
+                needed = (len(line) + 7) // 8
+                if needed > stride:
+                    padding = bytes(needed - stride)
+                    wall_bits = bytearray().join(
+                        wall_bits[i * stride:(i + 1) * stride] + padding
+                        for i in range(height)
+                    )
+                    stride = needed
+                width = max(width, len(line))
+
+                wall_bits += pack_row(line, stride)
+                markers = ("A", "B") if isinstance(line, str) else (b"A", b"B")
+                for marker, found in zip(markers, (starts, goals)):
+                    col = line.find(marker)
+                    while col != -1 and len(found) < 2:
+                        found.append((height, col))
+                        col = line.find(marker, col + 1)
+                height += 1
+
+    if len(starts) != 1:
+        raise Exception("maze must have exactly one start point")
+    if len(goals) != 1:
+        raise Exception("maze must have exactly one goal")
+    return wall_bits, height, width, stride, starts[0], goals[0]
+
+
+def unpack_bits(bits, height, stride, width):
+    """
+    Returns rows of `stride` packed bytes as a height x width NumPy array
+    of bools.
+    """
+    import numpy as np
+    rows = np.frombuffer(bytes(bits), dtype=np.uint8)[:height * stride].reshape(height, stride)
+    return np.unpackbits(rows, axis=1, bitorder="little")[:, :width].astype(bool)
+
+
+class CellSet():
+    """
+    Set of maze cells stored as one bit per cell.
+    """
+
+    def __init__(self, bits, row_bits):
+        self.bits = bits
+        self.row_bits = row_bits
+
+    def __contains__(self, state):
+        i = state[0] * self.row_bits + state[1]
+        return self.bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def __len__(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def add(self, state):
+        i = state[0] * self.row_bits + state[1]
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def mask(self, height, width):
+        """
+        Returns the set as a height x width NumPy array of bools.
+        """
+        return unpack_bits(self.bits, height, self.row_bits // 8, width)
+
+
+class WallRows():
+    """
+    Read-only view that makes packed walls look like Maze.walls.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+
+    def __len__(self):
+        return self.maze.height
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.maze.height:
+            raise IndexError("row out of range")
+        return [self.maze.is_wall(i, j) for j in range(self.maze.width)]
+
+    def __iter__(self):
+        for i in range(self.maze.height):
+            yield self[i]
+
+
+class CompactMaze(Maze):
+    """
+    Maze that keeps its walls in a bitset instead of lists of bools.
+
+    Cells are addressed by the flat index row * row_bits + col, where
+    every row is padded to a whole number of bytes. Depth-first and
+    breadth-first solves run directly on those indices with bitmaps for
+    the explored and frontier sets, so memory stays at a few bits per
+    cell. Other solvers fall back to the generic Maze implementations.
+    """
+
+    def __init__(self, filename):
+        (self.wall_bits, self.height, self.width, self.stride,
+         self.start, self.goal) = load_walls(filename)
+        self.row_bits = self.stride * 8
+        self.solution = None
+        self.stats = SearchStats()
+
+
+    @property
+    def walls(self):
+        return WallRows(self)
+
+
+    def wall_mask(self):
+        return unpack_bits(self.wall_bits, self.height, self.stride, self.width)
+
+
+    def is_wall(self, row, col):
+        i = row * self.row_bits + col
+        return self.wall_bits[i >> 3] >> (i & 7) & 1 == 1
+
+
+    def neighbors(self, state):
+        row, col = state
+        result = []
+        if row > 0 and not self.is_wall(row - 1, col):
+            result.append(("up", (row - 1, col)))
+        if row < self.height - 1 and not self.is_wall(row + 1, col):
+            result.append(("down", (row + 1, col)))
+        if col > 0 and not self.is_wall(row, col - 1):
+            result.append(("left", (row, col - 1)))
+        if col < self.width - 1 and not self.is_wall(row, col + 1):
+            result.append(("right", (row, col + 1)))
+        return result
+
+
+    @instrumented
+    def solve(self, frontier_class=IndexedStackFrontier):
+        """
+        Finds a solution to maze, if one exists.
+
+        Stack and queue frontiers are searched on packed cell indices in
+        the same order Maze.solve would use; any other frontier class is
+        handed to Maze.solve.
+        """
+        if issubclass(frontier_class, (QueueFrontier, IndexedQueueFrontier)):
+            breadth_first = True
+        elif issubclass(frontier_class, (StackFrontier, IndexedStackFrontier)):
+            breadth_first = False
+        else:
+            return super().solve(frontier_class)
+
+        stats = self.stats
+        walls = self.wall_bits
+        height, width, row_bits = self.height, self.width, self.row_bits
+        explored = bytearray(len(walls))
+        queued = bytearray(len(walls))
+        parents = bytearray(len(walls) * 2)
+        start = self.start[0] * row_bits + self.start[1]
+        goal = self.goal[0] * row_bits + self.goal[1]
+
+        # The frontier is an array of indices; a queue pops from `head`
+        frontier = array("q", [start])
+        head = 0
+        queued[start >> 3] |= 1 << (start & 7)
+        stats.generate(self.start, 1)
+
+        while True:
+
+            if head == len(frontier):
+                raise Exception("no solution")
+
+            if breadth_first:
+                i = frontier[head]
+                head += 1
+                if head > 4096 and head * 2 > len(frontier):
+                    del frontier[:head]
+                    head = 0
+            else:
+                i = frontier.pop()
+            queued[i >> 3] &= ~(1 << (i & 7))
+            row, col = divmod(i, row_bits)
+            stats.expand((row, col))
+
+            if i == goal:
+                break
+
+            explored[i >> 3] |= 1 << (i & 7)
+
+            for action, j, inside in (
+                (0, i - row_bits, row > 0),
+                (1, i + row_bits, row < height - 1),
+                (2, i - 1, col > 0),
+                (3, i + 1, col < width - 1)
+            ):
+                if not inside:
+                    continue
+                byte, bit = j >> 3, 1 << (j & 7)
+                if walls[byte] & bit:
+                    continue
+                if (explored[byte] | queued[byte]) & bit:
+                    stats.duplicates += 1
+                    continue
+                queued[byte] |= bit
+                parents[j >> 2] |= action << ((j & 3) * 2)
+                frontier.append(j)
+                stats.generate(divmod(j, row_bits), len(frontier) - head)
+
+        # Follow parent actions back from the goal
+        with stats.phase("reconstruct"):
+            actions = []
+            cells = []
+            offsets = (row_bits, -row_bits, 1, -1)
+            while i != start:
+                action = parents[i >> 2] >> ((i & 3) * 2) & 3
+                actions.append(ACTIONS[action])
+                cells.append(divmod(i, row_bits))
+                i += offsets[action]
+            actions.reverse()
+            cells.reverse()
+            self.solution = (actions, cells)
+        self.explored = CellSet(explored, row_bits)
+
+
+SOLVERS = ("dfs", "bfs", "astar", "greedy", "bidirectional", "jps", "ida", "frontier")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a maze.")
+    parser.add_argument("maze", help="maze text file")
+    parser.add_argument("--mode", choices=SOLVERS, default="dfs",
+                        help="search algorithm (default: dfs)")
+    parser.add_argument("--heuristic", choices=sorted(HEURISTICS),
+                        default="manhattan",
+                        help="heuristic for astar and greedy (default: manhattan)")
+    parser.add_argument("--compact", action="store_true",
+                        help="store walls and search state in bitsets")
+    parser.add_argument("--memory-limit", type=float,
+                        help="memory cap in MB for the ida and frontier modes")
+    parser.add_argument("--table-size", type=int, default=1 << 16,
+                        help="states the ida mode remembers (default: 65536)")
+    parser.add_argument("--cell-size", type=int, default=50,
+                        help="pixels per cell in maze.png (default: 50)")
+    parser.add_argument("--tile-size", type=int,
+                        help="write maze.png as tiles of this many cells per side")
+    args = parser.parse_args()
+
+    m = CompactMaze(args.maze) if args.compact else Maze(args.maze)
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    heuristic = HEURISTICS[args.heuristic]
+    memory_limit = None if args.memory_limit is None else int(args.memory_limit * 2 ** 20)
+    if args.mode == "dfs":
+        m.solve()
+    elif args.mode == "bfs":
+        m.solve(frontier_class=IndexedQueueFrontier)
+    elif args.mode == "astar":
+        m.solve_astar(heuristic)
+    elif args.mode == "greedy":
+        m.solve_greedy(heuristic)
+    elif args.mode == "bidirectional":
+        m.solve_bidirectional()
+    elif args.mode == "jps":
+        m.solve_jps(heuristic)
+    elif args.mode == "ida":
+        if args.table_size < m.height * m.width:
+            print(f"Warning: a table of {args.table_size} states is smaller than the maze; "
+                  f"ida may take exponentially long on mazes with loops")
+        m.solve_ida(heuristic, memory_limit, args.table_size)
+    else:
+        m.solve_frontier(memory_limit)
+    print("States Explored:", m.num_explored)
+    print(f"Time: {m.solve_time:.4f}s")
+    if m.stats.peak_memory is not None:
+        print(f"Peak memory: {m.stats.peak_memory / 2 ** 20:.2f} MB")
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True,
+                   cell_size=args.cell_size, tile_size=args.tile_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import os
+import time
+from array import array
+from collections import Counter, deque
+
+from maze import Maze, CompactMaze, manhattan
+
+
+class PathService():
+    """
+    Answers many start/goal queries against the same maze.
+
+    Breadth-first distance fields are computed for goals that are asked
+    for often and for a few landmark cells, and kept both in memory and
+    in `cache_dir` so later runs can reuse them. A query whose goal has a
+    distance field is answered by walking downhill in the field. Any
+    other query runs A* with the ALT heuristic: by the triangle
+    inequality, |d(L, goal) - d(L, cell)| is a lower bound on the
+    distance from cell to goal for every landmark L.
+    """
+
+    def __init__(self, filename, compact=False, cache_dir=".maze-cache", landmarks=4):
+        self.maze = CompactMaze(filename) if compact else Maze(filename)
+        self.cache_dir = cache_dir
+        self.fields = {}
+
+        # Cache files are keyed by the contents of the maze
+        digest = hashlib.sha1()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.digest = digest.hexdigest()[:16]
+
+        self.landmarks = self.choose_landmarks(landmarks)
+
+
+    def distance_field(self, cell):
+        """
+        Returns an array with the number of steps from `cell` to every
+        cell of the maze, indexed by row * width + col, or -1 where a
+        cell cannot be reached.
+        """
+        if cell in self.fields:
+            return self.fields[cell]
+
+        path = None
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f"{self.digest}-{cell[0]}-{cell[1]}.field")
+            if os.path.exists(path):
+                field = array("i")
+                with open(path, "rb") as f:
+                    field.fromfile(f, self.maze.height * self.maze.width)
+                self.fields[cell] = field
+                return field
+
+        width = self.maze.width
+        field = array("i", [-1]) * (self.maze.height * width)
+        field[cell[0] * width + cell[1]] = 0
+        queue = deque([cell])
+        while queue:
+            state = queue.popleft()
+            distance = field[state[0] * width + state[1]] + 1
+            for _, (r, c) in self.maze.neighbors(state):
+                if field[r * width + c] == -1:
+                    field[r * width + c] = distance
+                    queue.append((r, c))
+
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, "wb") as f:
+                field.tofile(f)
+        self.fields[cell] = field
+        return field
+
+
+    def choose_landmarks(self, k):
+        """
+        Picks `k` landmarks spread across the maze: each new landmark is
+        the reachable cell farthest from all landmarks picked so far.
+        """
+        landmarks = []
+        width = self.maze.width
+        closest = None
+        cell = self.maze.start
+        for _ in range(k):
+            field = self.distance_field(cell)
+            landmarks.append(cell)
+            if closest is None:
+                closest = array("i", field)
+            else:
+                for i, distance in enumerate(field):
+                    if distance < closest[i]:
+                        closest[i] = distance
+            farthest = max(range(len(closest)), key=closest.__getitem__)
+            if closest[farthest] <= 0:
+                break
+            cell = divmod(farthest, width)
+        return landmarks
+
+
+    def precompute(self, queries, min_uses=2):
+        """
+        Computes distance fields for every goal that appears in at least
+        `min_uses` of `queries`.
+        """
+        uses = Counter(goal for _, goal in queries)
+        for goal, n in uses.items():
+            if n >= min_uses:
+                self.distance_field(goal)
+
+
+    def query(self, start, goal):
+        """
+        Returns the (actions, cells) shortest path from `start` to `goal`
+        and the method used to find it.
+        """
+        for cell in (start, goal):
+            if not self.maze.passable(*cell):
+                raise Exception(f"{cell} is not an open cell")
+
+        if goal in self.fields:
+            return self.descend(start, goal), "field"
+
+        width = self.maze.width
+        fields = [self.fields[landmark] for landmark in self.landmarks]
+        goal_distances = [field[goal[0] * width + goal[1]] for field in fields]
+
+        def alt(state, goal):
+            i = state[0] * width + state[1]
+            bound = manhattan(state, goal)
+            for field, goal_distance in zip(fields, goal_distances):
+                if field[i] >= 0 and goal_distance >= 0:
+                    bound = max(bound, abs(goal_distance - field[i]))
+            return bound
+
+        self.maze.start = start
+        self.maze.goal = goal
+        self.maze.solve_astar(alt)
+        return self.maze.solution, "alt"
+
+
+    def descend(self, start, goal):
+        """
+        Follows the distance field of `goal` downhill from `start`.
+        """
+        field = self.fields[goal]
+        width = self.maze.width
+        distance = field[start[0] * width + start[1]]
+        if distance == -1:
+            raise Exception("no solution")
+
+        actions = []
+        cells = []
+        state = start
+        while distance > 0:
+            for action, (r, c) in self.maze.neighbors(state):
+                if field[r * width + c] == distance - 1:
+                    break
+            actions.append(action)
+            cells.append((r, c))
+            state = (r, c)
+            distance -= 1
+        return (actions, cells)
+
+
+def load_queries(filename):
+    """
+    Reads one "start_row start_col goal_row goal_col" query per line,
+    skipping blank lines and lines that start with #.
+    """
+    queries = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            r1, c1, r2, c2 = (int(n) for n in line.split())
+            queries.append(((r1, c1), (r2, c2)))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer many path queries on one maze.")
+    parser.add_argument("maze", help="maze text file")
+    parser.add_argument("queries", help="file of 'start_row start_col goal_row goal_col' lines")
+    parser.add_argument("--landmarks", type=int, default=4,
+                        help="number of ALT landmarks (default: 4)")
+    parser.add_argument("--min-uses", type=int, default=2,
+                        help="precompute fields for goals queried this often (default: 2)")
+    parser.add_argument("--cache-dir", default=".maze-cache",
+                        help="where to keep distance fields (default: .maze-cache)")
+    parser.add_argument("--compact", action="store_true",
+                        help="store walls in a bitset")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    service = PathService(args.maze, compact=args.compact,
+                          cache_dir=args.cache_dir, landmarks=args.landmarks)
+    queries = load_queries(args.queries)
+    service.precompute(queries, args.min_uses)
+    print(f"Prepared {len(service.fields)} distance fields "
+          f"in {time.perf_counter() - started:.4f}s")
+
+    started = time.perf_counter()
+    for start, goal in queries:
+        try:
+            solution, method = service.query(start, goal)
+            length = len(solution[0])
+        except Exception as e:
+            print(*start, *goal, f"error: {e}")
+            continue
+        print(*start, *goal, length, method)
+    print(f"Answered {len(queries)} queries in {time.perf_counter() - started:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
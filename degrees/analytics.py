@@ -0,0 +1,168 @@
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+def resolve(name):
+    """
+    Returns the index of the person with this name or id, preferring
+    the most prolific person when several share the name.
+    """
+    if name in degrees.people:
+        return degrees.graph.person_index[name]
+    matches = degrees.index.exact(name) or degrees.index.search(name, 1)
+    if not matches:
+        raise Exception(f"person not found: {name}")
+    return matches[0]
+
+
+def distribution(source):
+    """
+    Returns a Counter of how many people are at each number of degrees
+    from `source`, with -1 counting the people not connected to them.
+    """
+    return Counter(degrees.graph.distances(source))
+
+
+def farthest(source):
+    """
+    Returns the person farthest from `source` and their distance.
+    """
+    distance = degrees.graph.distances(source)
+    person = max(range(len(distance)), key=distance.__getitem__)
+    return person, distance[person]
+
+
+def double_sweep(start, sweeps=2):
+    """
+    Returns a lower bound on the diameter of the component of `start`,
+    with the two people it was found between.
+
+    Each sweep runs a BFS from the far end of the previous sweep. The
+    eccentricity of a far-away person is usually close to the diameter,
+    so a couple of sweeps give a tight bound on real-world graphs for
+    the cost of a few BFS runs instead of one from every person.
+    """
+    best = (0, start, start)
+    source = start
+    for _ in range(sweeps):
+        target, distance = farthest(source)
+        if distance > best[0]:
+            best = (distance, source, target)
+        if target == source:
+            break
+        source = target
+    return best
+
+
+def sample_separation(samples, seed=0, workers=None, directory=None):
+    """
+    Returns a Counter of distances between `samples` random sources and
+    every person connected to them, computed in a pool of processes
+    that each load the data from `directory`.
+    """
+    graph = degrees.graph
+    rng = random.Random(seed)
+    people = [
+        person for person in range(len(graph.person_ids))
+        if len(graph.movies_of(person)) > 0
+    ]
+    sources = [rng.choice(people) for _ in range(samples)]
+
+    total = Counter()
+    with ProcessPoolExecutor(workers, initializer=degrees.load_data,
+                             initargs=(directory,)) as pool:
+        for counts in pool.map(distribution, sources):
+            total.update(counts)
+    return total
+
+
+def summarize(counts):
+    """
+    Returns the number of connected pairs and their mean and largest
+    distance, given a Counter of distances.
+    """
+    pairs = sum(n for distance, n in counts.items() if distance > 0)
+    if pairs == 0:
+        return {"pairs": 0, "mean": None, "max": None}
+    return {
+        "pairs": pairs,
+        "mean": sum(distance * n for distance, n in counts.items() if distance > 0) / pairs,
+        "max": max(counts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degree of separation statistics.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("--source", default="Kevin Bacon",
+                        help="person to compute the distance histogram from (default: Kevin Bacon)")
+    parser.add_argument("--sweeps", type=int, default=4,
+                        help="double-sweep BFS runs for the diameter (default: 4)")
+    parser.add_argument("--samples", type=int, default=20,
+                        help="random sources for the average separation (default: 20)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed (default: 0)")
+    parser.add_argument("--workers", type=int,
+                        help="number of processes (default: one per CPU)")
+    parser.add_argument("--output", default="report.json",
+                        help="JSON report file (default: report.json)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory)
+    report = {"directory": args.directory, "people": len(degrees.people),
+              "movies": len(degrees.movies)}
+
+    started = time.perf_counter()
+    source = resolve(args.source)
+    counts = distribution(source)
+    report["source"] = {
+        "id": degrees.graph.person_ids[source],
+        "name": degrees.people[degrees.graph.person_ids[source]]["name"],
+        "histogram": {str(distance): n for distance, n in sorted(counts.items()) if distance >= 0},
+        "unreachable": counts[-1],
+        **summarize(counts),
+        "seconds": time.perf_counter() - started
+    }
+    print(f"Distances from {report['source']['name']}:")
+    for distance, n in report["source"]["histogram"].items():
+        print(f"{distance:>4} {n:>10}")
+    print(f"  unreachable {counts[-1]}")
+
+    started = time.perf_counter()
+    diameter, start, end = double_sweep(source, args.sweeps)
+    report["diameter"] = {
+        "lower_bound": diameter,
+        "between": [degrees.graph.person_ids[start], degrees.graph.person_ids[end]],
+        "sweeps": args.sweeps,
+        "seconds": time.perf_counter() - started
+    }
+    print(f"Diameter is at least {diameter}")
+
+    started = time.perf_counter()
+    counts = sample_separation(args.samples, args.seed, args.workers, args.directory)
+    report["separation"] = {
+        "samples": args.samples,
+        "seed": args.seed,
+        **summarize(counts),
+        "seconds": time.perf_counter() - started
+    }
+    if report["separation"]["mean"] is not None:
+        print(f"Average separation is about {report['separation']['mean']:.3f} "
+              f"over {report['separation']['pairs']} connected pairs")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import random
+import time
+
+import degrees
+
+# Name and search method of the graph
+SEARCHES = [
+    ("bfs", lambda graph: graph.shortest_path),
+    ("bidirectional", lambda graph: graph.bidirectional_path),
+]
+
+
+def random_pairs(n, seed=0):
+    """
+    Returns `n` random (source, target) pairs of person indices, drawn
+    from people who starred in at least one movie.
+    """
+    graph = degrees.graph
+    rng = random.Random(seed)
+    people = [
+        person for person in range(len(graph.person_ids))
+        if len(graph.movies_of(person)) > 0
+    ]
+    return [tuple(rng.sample(people, 2)) for _ in range(n)]
+
+
+def benchmark(pairs, searches):
+    """
+    Runs every search on every pair and yields one report row per run.
+    """
+    graph = degrees.graph
+    for source, target in pairs:
+        for name, search in searches:
+            started = time.perf_counter()
+            path = search(graph)(source, target)
+            yield {
+                "source": graph.person_ids[source],
+                "target": graph.person_ids[target],
+                "search": name,
+                "degrees": None if path is None else len(path),
+                "explored": graph.num_explored,
+                "seconds": time.perf_counter() - started
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees searches on random pairs.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("--pairs", type=int, default=20,
+                        help="number of random pairs (default: 20)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed (default: 0)")
+    parser.add_argument("--searches", nargs="+", choices=[name for name, _ in SEARCHES],
+                        help="searches to run (default: all)")
+    args = parser.parse_args()
+
+    searches = [search for search in SEARCHES if args.searches is None or search[0] in args.searches]
+
+    started = time.perf_counter()
+    degrees.load_data(args.directory)
+    print(f"Loaded {len(degrees.people)} people and {len(degrees.movies)} movies "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    print(f"{'source':>10} {'target':>10} {'search':<14} {'degrees':>7} "
+          f"{'explored':>9} {'seconds':>9}")
+    totals = {name: [0, 0] for name, _ in searches}
+    lengths = {}
+    for row in benchmark(random_pairs(args.pairs, args.seed), searches):
+        print(f"{row['source']:>10} {row['target']:>10} {row['search']:<14} "
+              f"{str(row['degrees']):>7} {row['explored']:>9} {row['seconds']:>9.4f}")
+        totals[row["search"]][0] += row["explored"]
+        totals[row["search"]][1] += row["seconds"]
+
+        # Every search should agree on the number of degrees
+        pair = (row["source"], row["target"])
+        if lengths.setdefault(pair, row["degrees"]) != row["degrees"]:
+            raise Exception(f"searches disagree on {pair}")
+
+    print()
+    for name, (explored, seconds) in totals.items():
+        print(f"{name:<14} {explored:>10} explored {seconds:>9.4f}s total")
+
+
+if __name__ == "__main__":
+    main()
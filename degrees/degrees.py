@@ -1,31 +1,54 @@
+import argparse
 import csv
 import sys
+from itertools import islice
 
-from util import Node, StackFrontier, QueueFrontier
+import nameindex
+import snapshot
+from graph import Graph
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Who starred in what, with people and movies interned to integers
+graph = Graph()
 
-def load_data(directory):
+# Finds people by name, name prefix or misspelled name
+index = None
+
+
+def load_data(directory, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `use_snapshot`, the data is memory-mapped from the compiled
+    snapshot in `directory` if it is up to date with the CSV files, and
+    the snapshot is (re)built after the CSV files are parsed otherwise.
     """
+    global names, people, movies, graph, index
+    if use_snapshot:
+        data = snapshot.load(directory)
+        if data is not None:
+            names, people, movies, graph = data
+            index = nameindex.build(names, people, graph)
+            return
+    names, people, movies, graph = {}, {}, {}, Graph()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            graph.add_person(row["id"])
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -37,31 +60,100 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            graph.add_movie(row["id"], year_of(row["year"]))
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                graph.add_star(graph.person_index[row["person_id"]],
+                               graph.movie_index[row["movie_id"]])
             except KeyError:
                 pass
+    graph.build()
+    index = nameindex.build(names, people, graph)
+
+    if use_snapshot:
+        try:
+            snapshot.save(directory, graph, people, movies)
+        except OSError:
+            pass
+
+
+def year_of(text):
+    """
+    Returns a year from movies.csv as an int, or 0 if it is not known.
+    """
+    return int(text) if text.isdigit() else 0
+
+
+def add_person(person_id, name, birth=""):
+    """
+    Adds a person to the loaded data without reloading it.
+    """
+    if person_id in people:
+        return
+    people[person_id] = {"name": name, "birth": birth}
+    names[name.lower()] = names.get(name.lower(), set()) | {person_id}
+    index.add(graph.add_person(person_id), name)
+
+
+def add_movie(movie_id, title, year=""):
+    """
+    Adds a movie to the loaded data without reloading it.
+    """
+    if movie_id in movies:
+        return
+    movies[movie_id] = {"title": title, "year": year}
+    graph.add_movie(movie_id, year_of(year))
+
+
+def add_star(person_id, movie_id):
+    """
+    Adds a credit to the loaded data without reloading it, and returns
+    the set of person_ids whose neighbors changed: if the credit is new,
+    the person and everyone else who starred in the movie.
+    """
+    person = graph.person_index[person_id]
+    movie = graph.movie_index[movie_id]
+    if not graph.insert_star(person, movie):
+        return set()
+    return {graph.person_ids[star] for star in graph.stars_of(movie)}
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Find the degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("--from-year", type=int,
+                        help="only use movies released in or after this year")
+    parser.add_argument("--to-year", type=int,
+                        help="only use movies released in or before this year")
+    parser.add_argument("--exclude-movie", action="append", default=[], metavar="TITLE",
+                        help="do not use this movie (title or id, can be repeated)")
+    parser.add_argument("--exclude-person", action="append", default=[], metavar="NAME",
+                        help="do not go through this person (name or id, can be repeated)")
+    parser.add_argument("--all", type=int, nargs="?", const=100, metavar="LIMIT",
+                        help="print every shortest path, up to LIMIT of them (default: 100)")
+    parser.add_argument("--k", type=int, metavar="K",
+                        help="print the K shortest paths that visit no one twice")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory)
     print("Data loaded.")
 
+    exclude_movies = set()
+    for title in args.exclude_movie:
+        exclude_movies |= movie_ids_for_title(title)
+    exclude_people = set()
+    for name in args.exclude_person:
+        exclude_people |= {name} if name in people else names.get(name.lower(), set())
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,108 +161,156 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    restrictions = (args.from_year, args.to_year, exclude_movies, exclude_people)
+    if args.all is not None or args.k is not None:
+        if args.all is not None:
+            paths = islice(all_shortest_paths(source, target, *restrictions), args.all)
+        else:
+            paths = k_shortest_paths(source, target, args.k, *restrictions)
+        found = 0
+        for found, path in enumerate(paths, 1):
+            print(f"Path {found}:")
+            print_path(source, path)
+        if found == 0:
+            print("Not connected.")
+        return
 
+    path = shortest_path(source, target, *restrictions)
     if path is None:
         print("Not connected.")
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
+
+def print_path(source, path):
+    """
+    Prints a path from `source` one movie per line.
+    """
+    degrees = len(path)
+    print(f"{degrees} degrees of separation.")
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = people[path[i][1]]["name"]
+        person2 = people[path[i + 1][1]]["name"]
+        movie = movies[path[i + 1][0]]["title"]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def filters(first_year=None, last_year=None, exclude_movies=(), exclude_people=()):
+    """
+    Returns predicates over graph indices for the movies and people a
+    path may use, either of which is None if there is no restriction.
+    """
+    movie_ok = graph.movie_filter(
+        first_year, last_year, {graph.movie_index[movie_id] for movie_id in exclude_movies}
+    )
+    person_ok = None
+    if exclude_people:
+        excluded = {graph.person_index[person_id] for person_id in exclude_people}
+        person_ok = lambda person: person not in excluded
+    return movie_ok, person_ok
+
+
+def shortest_path(source, target, first_year=None, last_year=None,
+                  exclude_movies=(), exclude_people=()):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    The path can be limited to movies released between `first_year`
+    and `last_year`, and kept away from the movie_ids in
+    `exclude_movies` and the person_ids in `exclude_people`.
+
     If no possible path, returns None.
     """
-    # Initialize frontier to just the starting position
-    start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
-    frontier.add(start)
+    movie_ok, person_ok = filters(first_year, last_year, exclude_movies, exclude_people)
+    path = graph.bidirectional_path(graph.person_index[source], graph.person_index[target],
+                                    movie_ok, person_ok)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
 
-    # Initialize an empty explored set
-    explored = set()
 
-    # Keep looping until solution found
-    while True:
+def all_shortest_paths(source, target, first_year=None, last_year=None,
+                       exclude_movies=(), exclude_people=()):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, with the same restrictions as
+    shortest_path.
+    """
+    movie_ok, person_ok = filters(first_year, last_year, exclude_movies, exclude_people)
+    for path in graph.all_shortest_paths(graph.person_index[source], graph.person_index[target],
+                                         movie_ok, person_ok):
+        yield [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
 
-        # If nothing left in frontier, then no path
-        if frontier.empty():
-            return None
 
-        # Choose a node from the frontier
-        node = frontier.remove()
-        state = node.state
-
-        # If node is the goal, then we have a solution
-        if state == target:
-            actions = []  # Initialize an empty list of actions
-            cells = []  # Initialize an empty list of cells
-            while node.parent is not None:  # If node is not the start node
-                actions.append(node.action)  # Add the action to the actions list
-                cells.append(node.state)  # Add the state to the cells list
-                node = node.parent  # Move to the parent node
-            actions.reverse()  # Reverse the actions list
-            cells.reverse()  # Reverse the cells list
-            solution = list(zip(actions, cells))  # Zip the actions and cells lists together
-            return solution  # Return the solution
-
-        # Mark node as explored
-        explored.add(state)
-
-        # Add neighbors to frontier
-        for action, state in neighbors_for_person(state): 
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                # print(f"{people[child.parent.state]["name"]} was in {movies[child.action]["title"]} with {people[child.state]["name"]}")
-                frontier.add(child)
+def k_shortest_paths(source, target, k, first_year=None, last_year=None,
+                     exclude_movies=(), exclude_people=()):
+    """
+    Yields up to `k` lists of (movie_id, person_id) pairs that connect
+    the source to the target without visiting anyone twice, shortest
+    first, with the same restrictions as shortest_path.
+    """
+    movie_ok, person_ok = filters(first_year, last_year, exclude_movies, exclude_people)
+    for path in graph.k_shortest_paths(graph.person_index[source], graph.person_index[target],
+                                       k, movie_ok, person_ok):
+        yield [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If nobody has exactly that name, people whose name starts with it
+    or is close to it are offered instead. Candidates are listed with
+    the people who starred in the most films first.
     """
-    person_ids = list(names.get(name.lower(), set()))
-    if len(person_ids) == 0:
-        return None
-    elif len(person_ids) > 1:
-        print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
-    else:
-        return person_ids[0]
+    matches = index.exact(name)
+    if len(matches) == 1:
+        return graph.person_ids[matches[0]]
+    if len(matches) == 0:
+        matches = index.search(name)
+        if len(matches) == 0:
+            return None
+    person_ids = [graph.person_ids[person] for person in matches]
+    print(f"Which '{name}'?")
+    for person_id, person in zip(person_ids, matches):
+        name = people[person_id]["name"]
+        birth = people[person_id]["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}, Films: {index.films(person)}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def movie_ids_for_title(title):
+    """
+    Returns the set of movie_ids with this title, ignoring case, or
+    the movie_id itself if `title` is one.
+    """
+    if title in movies:
+        return {title}
+    title = title.lower()
+    return {movie_id for movie_id in movies if movies[movie_id]["title"].lower() == title}
 
 
-def neighbors_for_person(person_id):
+def neighbors_for_person(person_id, first_year=None, last_year=None,
+                         exclude_movies=(), exclude_people=()):
     """
     Returns (movie_id, person_id) pairs for people
-    who starred with a given person.
-    """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    who starred with a given person, with the same
+    restrictions as shortest_path.
+    """
+    movie_ok, person_ok = filters(first_year, last_year, exclude_movies, exclude_people)
+    return {
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in graph.neighbors(graph.person_index[person_id], movie_ok, person_ok)
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,488 @@
+import heapq
+from array import array
+from itertools import count
+
+from util import breadth_first_search
+
+
+def compress(rows, cols, n):
+    """
+    Returns the compressed sparse row form of the (rows[i], cols[i])
+    pairs for rows numbered 0 to n - 1: an array `start` of n + 1
+    offsets and an array `adjacent` in which the columns of row r are
+    adjacent[start[r]:start[r + 1]].
+    """
+    start = array("i", [0]) * (n + 1)
+    for row in rows:
+        start[row + 1] += 1
+    for row in range(n):
+        start[row + 1] += start[row]
+
+    # Fill every row from its start, using `position` as a cursor
+    position = array("i", start[:n])
+    adjacent = array("i", [0]) * len(rows)
+    for row, col in zip(rows, cols):
+        adjacent[position[row]] = col
+        position[row] += 1
+    return start, adjacent
+
+
+def deduplicate(start, adjacent):
+    """
+    Returns the compressed sparse rows `start` and `adjacent` with
+    repeated columns dropped from each row, keeping the first of them.
+    """
+    unique_start = array("i", [0]) * len(start)
+    unique = array("i")
+    for row in range(len(start) - 1):
+        columns = adjacent[start[row]:start[row + 1]]
+        if len(set(columns)) < len(columns):
+            columns = dict.fromkeys(columns)
+        unique.extend(columns)
+        unique_start[row + 1] = len(unique)
+    return unique_start, unique
+
+
+class Graph():
+    """
+    Bipartite graph of people and the movies they starred in.
+
+    IMDb ids are interned to consecutive integer indices, and the edges
+    are kept as compressed sparse rows in both directions, so the
+    movies of person p are person_movies[person_start[p]:person_start[p + 1]]
+    and the stars of movie m are movie_people[movie_start[m]:movie_start[m + 1]].
+    Edges inserted after build() are kept in `added_movies` and
+    `added_stars` until the next build(), and movies_of() and stars_of()
+    combine the two.
+    """
+
+    def __init__(self):
+        self.person_ids = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_index = {}
+
+        # Release year of each movie, or 0 if it is not known
+        self.movie_year = array("i")
+
+        # Edges as parallel arrays until build() compresses them
+        self.edge_people = array("i")
+        self.edge_movies = array("i")
+
+        self.person_start = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_start = array("i", [0])
+        self.movie_people = array("i")
+
+        # Edges inserted since the last build(), by person and by movie
+        self.added_movies = {}
+        self.added_stars = {}
+
+        # Number of people expanded by the last search
+        self.num_explored = 0
+
+    def add_person(self, person_id):
+        """
+        Returns the index of `person_id`, interning it if it is new.
+        """
+        index = self.person_index.get(person_id)
+        if index is None:
+            index = self.person_index[person_id] = len(self.person_ids)
+            self.person_ids.append(person_id)
+        return index
+
+    def add_movie(self, movie_id, year=0):
+        """
+        Returns the index of `movie_id`, interning it if it is new.
+        """
+        index = self.movie_index.get(movie_id)
+        if index is None:
+            index = self.movie_index[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.movie_year.append(year)
+        return index
+
+    def add_star(self, person, movie):
+        """
+        Records that the person with index `person` starred in the movie
+        with index `movie`. Takes effect at the next build().
+        """
+        self.edge_people.append(person)
+        self.edge_movies.append(movie)
+
+    def insert_star(self, person, movie):
+        """
+        Records that the person with index `person` starred in the movie
+        with index `movie`, taking effect immediately. Returns False if
+        the edge was already in the graph.
+
+        New edges are kept in small per-person and per-movie lists next
+        to the compressed arrays until the next build() merges them in.
+        """
+        if movie in self.movies_of(person):
+            return False
+        self.added_movies.setdefault(person, []).append(movie)
+        self.added_stars.setdefault(movie, []).append(person)
+        return True
+
+    def build(self):
+        """
+        Compresses the recorded edges into the adjacency arrays. An
+        edge recorded more than once is kept once, as a person's
+        movies and a movie's stars are sets.
+        """
+        # Carry over the edges that are already in the graph
+        if len(self.person_movies) or self.added_movies:
+            for person in range(len(self.person_ids)):
+                for movie in self.movies_of(person):
+                    self.edge_people.append(person)
+                    self.edge_movies.append(movie)
+            self.added_movies = {}
+            self.added_stars = {}
+
+        self.person_start, self.person_movies = deduplicate(*compress(
+            self.edge_people, self.edge_movies, len(self.person_ids)
+        ))
+        self.movie_start, self.movie_people = deduplicate(*compress(
+            self.edge_movies, self.edge_people, len(self.movie_ids)
+        ))
+        self.edge_people = array("i")
+        self.edge_movies = array("i")
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies the person with index
+        `person` starred in.
+        """
+        if person + 1 < len(self.person_start):
+            movies = self.person_movies[self.person_start[person]:self.person_start[person + 1]]
+        else:
+            movies = ()
+        if self.added_movies and person in self.added_movies:
+            return [*movies, *self.added_movies[person]]
+        return movies
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in the movie
+        with index `movie`.
+        """
+        if movie + 1 < len(self.movie_start):
+            stars = self.movie_people[self.movie_start[movie]:self.movie_start[movie + 1]]
+        else:
+            stars = ()
+        if self.added_stars and movie in self.added_stars:
+            return [*stars, *self.added_stars[movie]]
+        return stars
+
+    def neighbors(self, person, movie_ok=None, person_ok=None):
+        """
+        Returns (movie, person) index pairs for people who starred
+        with the person with index `person`, leaving out the movies and
+        people for which `movie_ok` or `person_ok` returns False.
+        """
+        neighbors = set()
+        for movie in self.movies_of(person):
+            if movie_ok is not None and not movie_ok(movie):
+                continue
+            for other in self.stars_of(movie):
+                if person_ok is None or person_ok(other):
+                    neighbors.add((movie, other))
+        return neighbors
+
+    def movie_filter(self, first_year=None, last_year=None, exclude=()):
+        """
+        Returns a predicate that accepts the index of a movie released
+        between `first_year` and `last_year` that is not in `exclude`,
+        or None if every movie is accepted. Movies without a known year
+        are rejected by a year range.
+
+        The predicate reads the year array directly, so the check only
+        happens for the movies a search reaches.
+        """
+        exclude = set(exclude)
+        dated = first_year is not None or last_year is not None
+        if not dated and not exclude:
+            return None
+        low = 1 if first_year is None else first_year
+        high = 1 << 30 if last_year is None else last_year
+        movie_year = self.movie_year
+
+        def movie_ok(movie):
+            if movie in exclude:
+                return False
+            return not dated or low <= movie_year[movie] <= high
+        return movie_ok
+
+    def distances(self, source):
+        """
+        Returns an array with the degrees of separation between `source`
+        and every person, or -1 for people who are not connected to them.
+        """
+        distance = array("i", [-1]) * len(self.person_ids)
+        scanned = bytearray(len(self.movie_ids))
+        movies_of, stars_of = self.movies_of, self.stars_of
+
+        distance[source] = 0
+        layer = [source]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for person in layer:
+                for movie in movies_of(person):
+                    if scanned[movie]:
+                        continue
+                    scanned[movie] = 1
+                    for star in stars_of(movie):
+                        if distance[star] == -1:
+                            distance[star] = depth
+                            next_layer.append(star)
+            layer = next_layer
+        return distance
+
+    def nearby(self, sources, limit):
+        """
+        Returns a dict that maps every person within `limit` degrees of
+        any of `sources` to their distance from the closest one.
+        """
+        distance = dict.fromkeys(sources, 0)
+        scanned = set()
+        movies_of, stars_of = self.movies_of, self.stars_of
+        layer = list(distance)
+        for depth in range(1, limit + 1):
+            next_layer = []
+            for person in layer:
+                for movie in movies_of(person):
+                    if movie in scanned:
+                        continue
+                    scanned.add(movie)
+                    for star in stars_of(movie):
+                        if star not in distance:
+                            distance[star] = depth
+                            next_layer.append(star)
+            layer = next_layer
+        return distance
+
+    def shortest_path(self, source, target, movie_ok=None, person_ok=None, blocked=()):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect `source` to `target`, or None if they are not connected.
+        Only movies for which `movie_ok` returns True and people for
+        which `person_ok` returns True are used, if they are given, and
+        the path does not start with any of the (movie, person) steps
+        in `blocked`.
+
+        Breadth-first search over the adjacency arrays. A movie's cast
+        only needs to be scanned once: after that, everyone in it has
+        already been reached.
+        """
+        self.num_explored = 0
+        scanned = set()
+        movies_of, stars_of = self.movies_of, self.stars_of
+        if person_ok is not None and not (person_ok(source) and person_ok(target)):
+            return None
+
+        def neighbors(person):
+            self.num_explored += 1
+            for movie in movies_of(person):
+                # With blocked steps, the source's movies may have to be
+                # scanned again from someone else
+                if person != source or not blocked:
+                    if movie in scanned:
+                        continue
+                    scanned.add(movie)
+                if movie_ok is not None and not movie_ok(movie):
+                    continue
+                for star in stars_of(movie):
+                    if person == source and (movie, star) in blocked:
+                        continue
+                    if person_ok is None or person_ok(star):
+                        yield movie, star
+
+        return breadth_first_search(source, target, neighbors)
+
+    def bidirectional_path(self, source, target, movie_ok=None, person_ok=None):
+        """
+        Returns the same kind of path as shortest_path, with the same
+        filters, searching from both ends at once.
+
+        Each round expands a whole layer of whichever side has the
+        smaller frontier. The first person reached by both sides lies on
+        a shortest path: before the round, the two sides had not met, so
+        every path is longer than the sum of their depths, and the new
+        meeting point gives a path only one longer than that sum.
+        """
+        if person_ok is not None and not (person_ok(source) and person_ok(target)):
+            return None
+        if source == target:
+            return []
+        self.num_explored = 0
+
+        # For each side, maps a reached person to the (movie, person)
+        # step it was reached through
+        parents = ({source: None}, {target: None})
+        scanned = (set(), set())
+        frontiers = ([source], [target])
+        movies_of, stars_of = self.movies_of, self.stars_of
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parent, other = parents[side], parents[1 - side]
+            seen = scanned[side]
+            layer = []
+            for person in frontiers[side]:
+                self.num_explored += 1
+                for movie in movies_of(person):
+                    if movie in seen:
+                        continue
+                    seen.add(movie)
+                    if movie_ok is not None and not movie_ok(movie):
+                        continue
+                    for star in stars_of(movie):
+                        if star in parent:
+                            continue
+                        if person_ok is not None and not person_ok(star):
+                            continue
+                        parent[star] = (movie, person)
+                        if star in other:
+                            return self.join(parents, star)
+                        layer.append(star)
+            frontiers[side][:] = layer
+        return None
+
+    def join(self, parents, meeting):
+        """
+        Returns the path from the source to the target through the
+        person `meeting`, who has been reached by both sides.
+        """
+        path = []
+        person = meeting
+        while parents[0][person] is not None:
+            movie, previous = parents[0][person]
+            path.append((movie, person))
+            person = previous
+        path.reverse()
+
+        person = meeting
+        while parents[1][person] is not None:
+            movie, following = parents[1][person]
+            path.append((movie, following))
+            person = following
+        return path
+
+    def all_shortest_paths(self, source, target, movie_ok=None, person_ok=None):
+        """
+        Yields every shortest path from `source` to `target`, as lists
+        of (movie, person) index pairs, with the same filters as
+        shortest_path.
+
+        A breadth-first search labels everyone up to the target's layer
+        with their distance from the source. The steps from a person to
+        a co-star one layer closer form a DAG that holds exactly the
+        shortest paths, and it is walked depth-first back from the
+        target, so paths are produced one at a time and the DAG itself
+        is never stored.
+        """
+        if person_ok is not None and not (person_ok(source) and person_ok(target)):
+            return
+        if source == target:
+            yield []
+            return
+        movies_of, stars_of = self.movies_of, self.stars_of
+
+        distance = {source: 0}
+        scanned = set()
+        layer = [source]
+        depth = 0
+        while layer and target not in distance:
+            depth += 1
+            next_layer = []
+            for person in layer:
+                for movie in movies_of(person):
+                    if movie in scanned:
+                        continue
+                    scanned.add(movie)
+                    if movie_ok is not None and not movie_ok(movie):
+                        continue
+                    for star in stars_of(movie):
+                        if star not in distance and (person_ok is None or person_ok(star)):
+                            distance[star] = depth
+                            next_layer.append(star)
+            layer = next_layer
+        if target not in distance:
+            return
+
+        def predecessors(person):
+            # Each step is yielded once, even if the arrays repeat it
+            closer = distance[person] - 1
+            seen = set()
+            for movie in movies_of(person):
+                if movie_ok is None or movie_ok(movie):
+                    for star in stars_of(movie):
+                        if distance.get(star) == closer and (movie, star) not in seen:
+                            seen.add((movie, star))
+                            yield movie, star
+
+        # steps[i] is the (movie, person) step into people[i]
+        people = [target]
+        steps = []
+        stack = [predecessors(target)]
+        while stack:
+            for movie, star in stack[-1]:
+                steps.append((movie, people[-1]))
+                if star == source:
+                    yield steps[::-1]
+                    steps.pop()
+                    continue
+                people.append(star)
+                stack.append(predecessors(star))
+                break
+            else:
+                stack.pop()
+                people.pop()
+                if steps:
+                    steps.pop()
+
+    def k_shortest_paths(self, source, target, k, movie_ok=None, person_ok=None):
+        """
+        Yields up to `k` paths from `source` to `target` that visit no
+        person twice, shortest first, with the same filters as
+        shortest_path.
+
+        Yen's algorithm: each new path branches off a previous one at
+        some spur person. It keeps the previous path up to the spur,
+        must not revisit anyone before the spur, and must not take a
+        step out of the spur that a path found earlier with the same
+        start already took.
+        """
+        path = self.shortest_path(source, target, movie_ok, person_ok)
+        if path is None:
+            return
+        found = [path]
+        candidates = []
+        seen = {tuple(path)}
+        tiebreak = count()
+        yield path
+
+        while len(found) < k:
+            previous = found[-1]
+            people = [source] + [person for _, person in previous]
+            for i in range(len(previous)):
+                spur = people[i]
+                root = previous[:i]
+                blocked = {path[i] for path in found if len(path) > i and path[:i] == root}
+                banned = set(people[:i])
+
+                def spur_ok(person):
+                    return person not in banned and (person_ok is None or person_ok(person))
+
+                branch = self.shortest_path(spur, target, movie_ok, spur_ok, blocked)
+                if branch is not None and tuple(root + branch) not in seen:
+                    seen.add(tuple(root + branch))
+                    heapq.heappush(candidates, (len(root) + len(branch), next(tiebreak), root + branch))
+            if not candidates:
+                return
+            path = heapq.heappop(candidates)[2]
+            found.append(path)
+            yield path
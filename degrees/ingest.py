@@ -0,0 +1,176 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+import degrees
+import snapshot
+
+
+def tail(filename, follow=False, interval=1.0):
+    """
+    Yields the complete lines of `filename`. With `follow`, keeps
+    waiting for lines appended to the file, and yields None each time
+    it has caught up with the end.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        partial = ""
+        while True:
+            line = f.readline()
+            if line.endswith("\n"):
+                yield partial + line
+                partial = ""
+                continue
+
+            # A line without a newline may still be being written
+            partial += line
+            if not follow:
+                if partial:
+                    yield partial
+                return
+            yield None
+            time.sleep(interval)
+
+
+def records(lines, jsonl=False):
+    """
+    Turns feed lines into dicts with any of the keys person_id, name,
+    birth, movie_id, title and year. A CSV feed starts with a header
+    line, like stars.csv; a JSONL feed has one object per line. None
+    is passed through.
+    """
+    header = None
+    for line in lines:
+        if line is None:
+            yield None
+        elif not line.strip():
+            continue
+        elif jsonl:
+            yield json.loads(line)
+        elif header is None:
+            header = next(csv.reader([line]))
+        else:
+            yield dict(zip(header, next(csv.reader([line]))))
+
+
+def apply(record):
+    """
+    Adds one feed record to the loaded data and returns the person_ids
+    whose neighbors changed. People and movies are added when the
+    record has a name or title, and a credit when it has both ids.
+    Credits for unknown people or movies are skipped, as in load_data.
+    """
+    person_id = record.get("person_id")
+    movie_id = record.get("movie_id")
+    if person_id and record.get("name") is not None:
+        degrees.add_person(person_id, record["name"], record.get("birth", ""))
+    if movie_id and record.get("title") is not None:
+        degrees.add_movie(movie_id, record["title"], record.get("year", ""))
+    if person_id and movie_id:
+        try:
+            return degrees.add_star(person_id, movie_id)
+        except KeyError:
+            pass
+    return set()
+
+
+def new_rows(record):
+    """
+    Returns the rows that applying `record` could add to people.csv,
+    movies.csv and stars.csv, as a (person, movie, star) tuple with None
+    for each file that it leaves alone. Must be called before apply().
+    """
+    person_id = record.get("person_id")
+    movie_id = record.get("movie_id")
+    person = movie = star = None
+    if person_id and record.get("name") is not None and person_id not in degrees.people:
+        person = [person_id, record["name"], record.get("birth", "")]
+    if movie_id and record.get("title") is not None and movie_id not in degrees.movies:
+        movie = [movie_id, record["title"], record.get("year", "")]
+    if person_id and movie_id:
+        star = [person_id, movie_id]
+    return person, movie, star
+
+
+def ends_with_newline(path):
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def save(directory, rows):
+    """
+    Appends new rows to the CSV files in `directory`, given as a dict
+    from file name to rows, and recompiles the snapshot from the loaded
+    data so that the next load_data need not parse the CSV files again.
+    """
+    for filename, new in rows.items():
+        if not new:
+            continue
+        path = os.path.join(directory, filename)
+        newline = not ends_with_newline(path)
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            if newline:
+                f.write("\n")
+            csv.writer(f, lineterminator="\n").writerows(new)
+
+    degrees.graph.build()
+    snapshot.save(directory, degrees.graph, degrees.people, degrees.movies)
+
+
+def batches(filename, follow=False, interval=1.0, size=1000):
+    """
+    Yields lists of at most `size` records from a feed, and while
+    following it, whatever has arrived each time it catches up.
+    """
+    batch = []
+    for record in records(tail(filename, follow, interval), filename.endswith(".jsonl")):
+        if record is not None:
+            batch.append(record)
+        if batch and (record is None or len(batch) >= size):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add a feed of new credits to the degrees data.")
+    parser.add_argument("directory", help="data directory")
+    parser.add_argument("feed", help="CSV or .jsonl feed of people, movies and credits")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only time applying the feed, without saving it")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory)
+    started = time.perf_counter()
+    applied = 0
+    touched = set()
+    rows = {"people.csv": [], "movies.csv": [], "stars.csv": []}
+    for batch in batches(args.feed):
+        for record in batch:
+            person, movie, star = new_rows(record)
+            changed = apply(record)
+            if person is not None:
+                rows["people.csv"].append(person)
+            if movie is not None:
+                rows["movies.csv"].append(movie)
+            if star is not None and changed:
+                rows["stars.csv"].append(star)
+            touched |= changed
+        applied += len(batch)
+    print(f"Applied {applied} records in {time.perf_counter() - started:.4f}s, "
+          f"changing the neighbors of {len(touched)} people")
+
+    if not args.dry_run and any(rows.values()):
+        started = time.perf_counter()
+        save(args.directory, rows)
+        print(f"Saved {len(rows['people.csv'])} people, {len(rows['movies.csv'])} movies "
+              f"and {len(rows['stars.csv'])} credits in {time.perf_counter() - started:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
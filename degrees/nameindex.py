@@ -0,0 +1,226 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from snapshot import Names, Sorted
+
+# Prefix matches beyond this many are not all ranked: the most prolific
+# people are looked up instead
+PREFIX_SCAN = 1000
+
+
+def trigrams(name):
+    """
+    Returns the set of three-letter substrings of a lowercased name,
+    padded so that the start and end of the name count as well.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between `a` and `b`, or limit + 1
+    if it is greater than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (x != y)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class NameIndex():
+    """
+    Finds people by exact name, name prefix or misspelled name.
+
+    Names are kept as an array of person indices sorted by lowercased
+    name, so exact and prefix lookups are binary searches that need no
+    extra copy of the names. Typo-tolerant search uses an inverted
+    index from trigrams to the distinct names that contain them, which
+    is only built the first time it is needed, as is a list of people
+    ordered by film count for short prefixes that match too many names
+    to rank. People added later are kept in a dict by name and searched
+    directly. Results are ranked by how many films a person starred in.
+    """
+
+    def __init__(self, person_names, order, graph):
+        self.person_names = person_names
+        self.order = order
+        self.sorted = Sorted(person_names, order, str.lower)
+        self.graph = graph
+        self.postings = None
+        self.prolific = None
+        self.positions = None
+        self.prolific_start = None
+        self.added = {}
+
+    def add(self, person, name):
+        """
+        Adds the person with index `person` under `name`.
+        """
+        self.added.setdefault(name.lower(), []).append(person)
+
+    def films(self, person):
+        return len(self.graph.movies_of(person))
+
+    def ranked(self, people, limit=None):
+        """
+        Returns person indices, the most prolific first.
+        """
+        people = set(people)
+        if limit is None:
+            return sorted(people, key=lambda person: (-self.films(person), person))
+        return heapq.nsmallest(limit, people, key=lambda person: (-self.films(person), person))
+
+    def run(self, position):
+        """
+        Yields the sorted positions of every person whose name equals
+        the name at `position`.
+        """
+        name = self.sorted[position]
+        while position < len(self.sorted) and self.sorted[position] == name:
+            yield position
+            position += 1
+
+    def exact(self, name):
+        """
+        Returns the people with exactly this name, ignoring case.
+        """
+        name = name.lower()
+        people = self.added.get(name, [])
+        position = bisect_left(self.sorted, name)
+        if position < len(self.sorted) and self.sorted[position] == name:
+            people = [*people, *(self.order[i] for i in self.run(position))]
+        return self.ranked(people)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` people whose name starts with `prefix`.
+        """
+        prefix = prefix.lower()
+        first = bisect_left(self.sorted, prefix)
+        if prefix:
+            last = bisect_left(self.sorted, prefix[:-1] + chr(ord(prefix[-1]) + 1), first)
+        else:
+            last = len(self.sorted)
+        if last - first <= PREFIX_SCAN:
+            people = [self.order[i] for i in range(first, last)]
+        else:
+            people = self.most_prolific(first, last, limit)
+        for name, added in self.added.items():
+            if name.startswith(prefix):
+                people.extend(added)
+        return self.ranked(people, limit)
+
+    def build_prolific(self):
+        """
+        Orders the people of the sorted names by how many films they
+        starred in as of the last build() of the graph, and records the
+        sorted position of each.
+        """
+        start = self.graph.person_start
+        self.prolific = array("i", sorted(range(len(self.order)),
+                                          key=lambda person: start[person] - start[person + 1]))
+        self.positions = array("i", [0]) * len(self.order)
+        for position, person in enumerate(self.order):
+            self.positions[person] = position
+        self.prolific_start = start
+
+    def most_prolific(self, first, last, limit):
+        """
+        Returns candidates for the `limit` most prolific people at
+        sorted positions first to last - 1: the most prolific of them
+        by their films at the last build(), and those who gained films
+        since, whose counts may have overtaken them.
+        """
+        if self.prolific is None or self.prolific_start is not self.graph.person_start:
+            self.build_prolific()
+        people = []
+        for person in self.prolific:
+            if first <= self.positions[person] < last:
+                people.append(person)
+                if len(people) == limit:
+                    break
+        for person in self.graph.added_movies:
+            if person < len(self.positions) and first <= self.positions[person] < last:
+                people.append(person)
+        return people
+
+    def build_postings(self):
+        """
+        Maps each trigram to an array of the sorted positions at which
+        a distinct name containing it starts.
+        """
+        postings = {}
+        previous = None
+        for position, name in enumerate(self.sorted):
+            if name == previous:
+                continue
+            previous = name
+            for trigram in trigrams(name):
+                if trigram not in postings:
+                    postings[trigram] = array("i")
+                postings[trigram].append(position)
+        self.postings = postings
+
+    def fuzzy(self, name, limit=10, max_distance=2):
+        """
+        Returns up to `limit` people whose name is within
+        `max_distance` edits of `name`, closest first.
+        """
+        if self.postings is None:
+            self.build_postings()
+        name = name.lower()
+        grams = trigrams(name)
+
+        # One edit changes at most three trigrams
+        shared = Counter()
+        for trigram in grams:
+            shared.update(self.postings.get(trigram, ()))
+        needed = len(grams) - 3 * max_distance
+
+        matches = []
+        for position, count in shared.items():
+            if count < needed:
+                continue
+            distance = edit_distance(name, self.sorted[position], max_distance)
+            if distance <= max_distance:
+                for i in self.run(position):
+                    person = self.order[i]
+                    matches.append((distance, -self.films(person), person))
+        for other, added in self.added.items():
+            distance = edit_distance(name, other, max_distance)
+            if distance <= max_distance:
+                matches.extend((distance, -self.films(person), person) for person in added)
+        return [person for _, _, person in heapq.nsmallest(limit, matches)]
+
+    def search(self, name, limit=10):
+        """
+        Returns up to `limit` people matching `name`: exact matches,
+        then prefix matches, then near misses.
+        """
+        results = []
+        for people in (self.exact(name), self.prefix(name, limit), self.fuzzy(name, limit)):
+            results.extend(person for person in people if person not in results)
+        return results[:limit]
+
+
+def build(names, people, graph):
+    """
+    Returns a NameIndex over the loaded data, reusing the sorted name
+    order of a snapshot when there is one.
+    """
+    if isinstance(names, Names):
+        return NameIndex(names.sorted.strings, names.order, graph)
+    person_names = [people[person_id]["name"] for person_id in graph.person_ids]
+    order = array("i", sorted(range(len(person_names)), key=lambda i: person_names[i].lower()))
+    return NameIndex(person_names, order, graph)
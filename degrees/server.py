@@ -0,0 +1,317 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+import ingest
+
+
+def search(source, target):
+    """
+    Runs in a worker process, where load_data has already memory-mapped
+    the snapshot, so all workers share the same pages of the graph.
+    """
+    return degrees.shortest_path(source, target)
+
+
+class PathServer():
+    """
+    Loads the data once and answers many shortest path queries.
+
+    Searches run in a pool of worker processes, or in this process if
+    `workers` is 0, and the results of the most recent `cache_size`
+    queries are kept in an LRU cache. Updates can only be applied when
+    searching in this process, since the workers have their own copy
+    of the graph.
+    """
+
+    def __init__(self, directory, workers=None, cache_size=1024):
+        # Loading in this process first compiles the snapshot if needed
+        degrees.load_data(directory)
+        self.pool = None
+        if workers != 0:
+            self.pool = ProcessPoolExecutor(
+                workers, initializer=degrees.load_data, initargs=(directory,)
+            )
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.graph_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def resolve(self, name):
+        """
+        Returns the person id for a name or an id, raising an exception
+        if there is no such person or the name is ambiguous.
+        """
+        # Names are added by update() while a feed is followed
+        with self.graph_lock:
+            return self.find(name)
+
+    def find(self, name):
+        """
+        Resolves a name like resolve(), with graph_lock already held.
+        """
+        if name in degrees.people:
+            return name
+        person_ids = degrees.names.get(name.lower(), set())
+        if len(person_ids) == 0:
+            suggestions = sorted({
+                degrees.people[degrees.graph.person_ids[person]]["name"]
+                for person in degrees.index.search(name, 5)
+            })
+            if suggestions:
+                raise Exception(f"person not found: {name}, did you mean: {', '.join(suggestions)}")
+            raise Exception(f"person not found: {name}")
+        if len(person_ids) > 1:
+            raise Exception(f"ambiguous name {name}, use one of: {', '.join(sorted(person_ids))}")
+        return next(iter(person_ids))
+
+    def describe(self, source, path):
+        """
+        Returns the steps of a path as (person, person, movie) names.
+        """
+        with self.graph_lock:
+            return describe(source, path)
+
+    def lookup(self, key):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return True, self.cache[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, path):
+        with self.lock:
+            self.cache[key] = path
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def paths(self, pairs):
+        """
+        Returns the shortest path for each (source, target) pair of
+        person ids, searching for the ones not in the cache in parallel.
+        """
+        results = {}
+        futures = {}
+        for key in pairs:
+            if key in results or key in futures:
+                continue
+            found, path = self.lookup(key)
+            if found:
+                results[key] = path
+            elif self.pool is None:
+                with self.graph_lock:
+                    results[key] = search(*key)
+                    self.store(key, results[key])
+            else:
+                futures[key] = self.pool.submit(search, *key)
+        for key, future in futures.items():
+            results[key] = future.result()
+            self.store(key, results[key])
+        return [results[key] for key in pairs]
+
+    def path(self, source, target):
+        return self.paths([(source, target)])[0]
+
+    def update(self, records):
+        """
+        Applies feed records to the graph and drops the cached results
+        they may have changed.
+        """
+        if self.pool is not None:
+            raise Exception("updates need workers=0")
+        touched = set()
+        with self.graph_lock:
+            for record in records:
+                touched |= ingest.apply(record)
+            self.invalidate(touched)
+
+    def invalidate(self, person_ids):
+        """
+        Drops the cached results that new credits for `person_ids` may
+        have changed.
+
+        New edges only join people in the touched set T, so a new path
+        from s to t is at least d(s, T) + 1 + d(T, t) long. A cached
+        shortest path of length d is still shortest if that bound is at
+        least d, so only the neighborhood of T within the longest cached
+        path needs to be searched. Cached "not connected" results are
+        always dropped.
+        """
+        if not person_ids:
+            return
+        graph = degrees.graph
+        with self.lock:
+            longest = max((len(path) for path in self.cache.values() if path is not None),
+                          default=0)
+            near = graph.nearby({graph.person_index[person_id] for person_id in person_ids},
+                                max(longest - 1, 0))
+            for (source, target), path in list(self.cache.items()):
+                if path is not None:
+                    to_source = near.get(graph.person_index[source])
+                    to_target = near.get(graph.person_index[target])
+                    if to_source is None or to_target is None:
+                        continue
+                    if to_source + to_target + 1 >= len(path):
+                        continue
+                del self.cache[(source, target)]
+
+
+def describe(source, path):
+    """
+    Returns the steps of a path as (person, person, movie) names.
+    """
+    steps = []
+    previous = source
+    for movie_id, person_id in path:
+        steps.append((degrees.people[previous]["name"],
+                      degrees.people[person_id]["name"],
+                      degrees.movies[movie_id]["title"]))
+        previous = person_id
+    return steps
+
+
+def load_pairs(filename):
+    """
+    Reads one tab-separated pair of names or person ids per line,
+    skipping blank lines and lines that start with #.
+    """
+    pairs = []
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            source, target = (name.strip() for name in line.split("\t"))
+            pairs.append((source, target))
+    return pairs
+
+
+def run_batch(server, filename):
+    """
+    Answers every pair of names in `filename` and prints the results.
+    """
+    pairs = load_pairs(filename)
+    queries = []
+    for source, target in pairs:
+        try:
+            queries.append((server.resolve(source), server.resolve(target)))
+        except Exception as e:
+            queries.append(e)
+
+    started = time.perf_counter()
+    paths = iter(server.paths([query for query in queries if isinstance(query, tuple)]))
+    for (source, target), query in zip(pairs, queries):
+        print(f"{source} -> {target}: ", end="")
+        if isinstance(query, Exception):
+            print(f"error: {query}")
+            continue
+        path = next(paths)
+        if path is None:
+            print("Not connected.")
+            continue
+        print(f"{len(path)} degrees of separation.")
+        for i, (person1, person2, movie) in enumerate(server.describe(query[0], path)):
+            print(f"  {i + 1}: {person1} and {person2} starred in {movie}")
+    print(f"Answered {len(pairs)} queries in {time.perf_counter() - started:.4f}s")
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Answers GET /?source=<name>&target=<name> with a JSON path.
+    """
+
+    server_version = "degrees/1.0"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if "source" not in query or "target" not in query:
+            return self.reply(400, {"error": "source and target are required"})
+        try:
+            source = self.server.paths.resolve(query["source"][0])
+            target = self.server.paths.resolve(query["target"][0])
+        except Exception as e:
+            return self.reply(404, {"error": str(e)})
+
+        path = self.server.paths.path(source, target)
+        if path is None:
+            return self.reply(200, {"degrees": None, "path": []})
+        return self.reply(200, {
+            "degrees": len(path),
+            "path": [
+                {"person1": person1, "person2": person2, "movie": movie}
+                for person1, person2, movie in self.server.paths.describe(source, path)
+            ]
+        })
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer many degrees of separation queries.")
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer the tab-separated name pairs in FILE and exit")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to serve on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="port to serve on (default: 8000)")
+    parser.add_argument("--workers", type=int,
+                        help="number of search processes (default: one per CPU)")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="number of recent results to keep (default: 1024)")
+    parser.add_argument("--feed", metavar="FILE",
+                        help="follow a CSV or .jsonl feed of new credits (searches in one process)")
+    parser.add_argument("--poll", type=float, default=1.0,
+                        help="seconds between checks of the feed (default: 1)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    workers = 0 if args.feed else args.workers
+    server = PathServer(args.directory, workers, args.cache_size)
+    print("Data loaded.", file=sys.stderr)
+    if args.feed:
+        def follow():
+            for records in ingest.batches(args.feed, follow=True, interval=args.poll):
+                server.update(records)
+        threading.Thread(target=follow, daemon=True).start()
+    try:
+        if args.batch:
+            run_batch(server, args.batch)
+            return
+        httpd = ThreadingHTTPServer((args.host, args.port), Handler)
+        httpd.paths = server
+        print(f"Serving on http://{args.host}:{args.port}/", file=sys.stderr)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        httpd.server_close()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+
+from graph import Graph
+
+# Name of the snapshot file inside a data directory
+FILENAME = "degrees.snapshot"
+
+# The CSV files a snapshot is compiled from
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGREES3"
+
+# Sections holding int32 arrays
+ARRAYS = (
+    "person_start", "person_movies", "movie_start", "movie_people",
+    "movie_year", "person_order", "movie_order", "name_order"
+)
+
+# Sections holding string tables
+STRINGS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+class Strings(Sequence):
+    """
+    Table of strings stored as one UTF-8 blob and an array of offsets,
+    so string i is blob[offsets[i]:offsets[i + 1]]. Strings are only
+    decoded when they are looked up. Appended strings are kept in a
+    list after the ones in the snapshot.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+        self.extra = []
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.extra)
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if i >= len(self.offsets) - 1:
+            return self.extra[i - len(self.offsets) + 1]
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, string):
+        self.extra.append(string)
+
+
+class Sorted(Sequence):
+    """
+    View of `strings` in the order given by the index array `order`,
+    passed through `key`, that can be searched with bisect.
+    """
+
+    def __init__(self, strings, order, key=None):
+        self.strings = strings
+        self.order = order
+        self.key = key
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        string = self.strings[self.order[i]]
+        return string if self.key is None else self.key(string)
+
+
+class Index(Mapping):
+    """
+    Maps each string of a table of unique strings to its index, by
+    binary search over the table sorted by `order`, or through a dict
+    for strings added after the snapshot was compiled.
+    """
+
+    def __init__(self, strings, order):
+        self.strings = strings
+        self.order = order
+        self.sorted = Sorted(strings, order)
+        self.extra = {}
+
+    def __len__(self):
+        return len(self.order) + len(self.extra)
+
+    def __iter__(self):
+        yield from self.sorted
+        yield from self.extra
+
+    def __getitem__(self, string):
+        if string in self.extra:
+            return self.extra[string]
+        i = bisect_left(self.sorted, string)
+        if i == len(self.sorted) or self.sorted[i] != string:
+            raise KeyError(string)
+        return self.order[i]
+
+    def __setitem__(self, string, i):
+        self.extra[string] = i
+
+
+class Records(Mapping):
+    """
+    Maps ids to dicts of their fields, like the `people` and `movies`
+    dicts of degrees.py, reading the fields from string tables.
+    Records that are set later are kept in a dict.
+    """
+
+    def __init__(self, ids, index, fields):
+        self.ids = ids
+        self.index = index
+        self.fields = fields
+        self.extra = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __getitem__(self, key):
+        if key in self.extra:
+            return self.extra[key]
+        i = self.index[key]
+        return {field: strings[i] for field, strings in self.fields.items()}
+
+    def __setitem__(self, key, record):
+        self.extra[key] = record
+
+
+class Names(Mapping):
+    """
+    Maps lowercased names to the set of ids of the people with that
+    name, like the `names` dict of degrees.py. Names that are set later
+    are kept in a dict.
+    """
+
+    def __init__(self, ids, names, order):
+        self.ids = ids
+        self.sorted = Sorted(names, order, str.lower)
+        self.order = order
+        self.extra = {}
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __iter__(self):
+        previous = None
+        for name in self.sorted:
+            if name != previous:
+                yield name
+                previous = name
+        for name in self.extra:
+            if not self.matches(name):
+                yield name
+
+    def matches(self, name):
+        first = bisect_left(self.sorted, name)
+        last = bisect_right(self.sorted, name, first)
+        return {self.ids[self.order[i]] for i in range(first, last)}
+
+    def __getitem__(self, name):
+        if name in self.extra:
+            return self.extra[name]
+        person_ids = self.matches(name)
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __setitem__(self, name, person_ids):
+        self.extra[name] = set(person_ids)
+
+
+def stamp(directory):
+    """
+    Returns the size and modification time of each source CSV file, so
+    that a snapshot can tell when they have changed.
+    """
+    stamps = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stamps[name] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def pack_strings(strings):
+    """
+    Returns the offsets array and UTF-8 blob of a Strings table.
+    """
+    offsets = array("i", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def save(directory, graph, people, movies):
+    """
+    Compiles the loaded data into a snapshot file in `directory`.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    person_names = [people[person_id]["name"] for person_id in person_ids]
+
+    sections = {
+        "person_start": graph.person_start,
+        "person_movies": graph.person_movies,
+        "movie_start": graph.movie_start,
+        "movie_people": graph.movie_people,
+        "movie_year": graph.movie_year,
+        "person_order": array("i", sorted(range(len(person_ids)), key=person_ids.__getitem__)),
+        "movie_order": array("i", sorted(range(len(movie_ids)), key=movie_ids.__getitem__)),
+        "name_order": array("i", sorted(range(len(person_ids)),
+                                        key=lambda i: person_names[i].lower()))
+    }
+    columns = {
+        "person_ids": person_ids,
+        "person_names": person_names,
+        "person_births": [people[person_id]["birth"] for person_id in person_ids],
+        "movie_ids": movie_ids,
+        "movie_titles": [movies[movie_id]["title"] for movie_id in movie_ids],
+        "movie_years": [movies[movie_id]["year"] for movie_id in movie_ids]
+    }
+    for name, strings in columns.items():
+        sections[f"{name}.offsets"], sections[f"{name}.blob"] = pack_strings(strings)
+
+    # Lay the sections out one after another, each aligned to 8 bytes
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [offset, size]
+        offset += (size + 7) & ~7
+    meta = json.dumps({"sources": stamp(directory), "sections": layout}).encode()
+    header = MAGIC + struct.pack("<I", len(meta)) + meta
+    base = (len(header) + 7) & ~7
+
+    path = os.path.join(directory, FILENAME)
+    with open(path + ".tmp", "wb") as f:
+        f.write(header.ljust(base, b"\0"))
+        for name, data in sections.items():
+            data = data.tobytes() if isinstance(data, array) else data
+            f.write(data.ljust((len(data) + 7) & ~7, b"\0"))
+    os.replace(path + ".tmp", path)
+
+
+def load(directory):
+    """
+    Opens the snapshot in `directory` and returns (names, people,
+    movies, graph) views of it, or None if there is no snapshot, the
+    CSV files have changed since it was compiled or the file is damaged.
+
+    The file is memory-mapped, so nothing is read until it is used and
+    processes that open the same snapshot share its pages.
+    """
+    path = os.path.join(directory, FILENAME)
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+    try:
+        size, = struct.unpack_from("<I", data, len(MAGIC))
+        start = len(MAGIC) + 4
+        meta = json.loads(data[start:start + size])
+        if meta["sources"] != stamp(directory):
+            return None
+        base = (start + size + 7) & ~7
+
+        # A damaged or truncated file is a miss, so the caller rebuilds it
+        for offset, size in meta["sections"].values():
+            if offset < 0 or size < 0 or base + offset + size > len(data):
+                return None
+        view = memoryview(data)
+
+        def section(name):
+            offset, size = meta["sections"][name]
+            return view[base + offset:base + offset + size]
+
+        sections = {name: section(name).cast("i") for name in ARRAYS}
+        for name in STRINGS:
+            offsets = section(f"{name}.offsets").cast("i")
+            blob = section(f"{name}.blob")
+            if len(offsets) == 0 or offsets[-1] != len(blob):
+                return None
+            sections[name] = Strings(offsets, blob)
+
+        # The years are small and are copied so that movies can be added
+        movie_year = array("i")
+        movie_year.frombytes(section("movie_year"))
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+    graph = Graph()
+    graph.person_ids = sections["person_ids"]
+    graph.movie_ids = sections["movie_ids"]
+    graph.person_index = Index(graph.person_ids, sections["person_order"])
+    graph.movie_index = Index(graph.movie_ids, sections["movie_order"])
+    for name in ("person_start", "person_movies", "movie_start", "movie_people"):
+        setattr(graph, name, sections[name])
+
+    graph.movie_year = movie_year
+
+    names = Names(graph.person_ids, sections["person_names"], sections["name_order"])
+    people = Records(graph.person_ids, graph.person_index, {
+        "name": sections["person_names"],
+        "birth": sections["person_births"]
+    })
+    movies = Records(graph.movie_ids, graph.movie_index, {
+        "title": sections["movie_titles"],
+        "year": sections["movie_years"]
+    })
+    return names, people, movies, graph
@@ -0,0 +1,49 @@
+import os
+import threading
+import unittest
+
+from server import PathServer
+
+
+class ConcurrentUpdateTest(unittest.TestCase):
+    """
+    Resolves names on one thread while another follows a feed that
+    adds people, as the HTTP threads and the follow thread do.
+    """
+
+    def test_resolve_during_update(self):
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+        server = PathServer(directory, workers=0)
+        errors = []
+        done = threading.Event()
+
+        def feed():
+            try:
+                for i in range(2000):
+                    server.update([{"person_id": f"new{i}", "name": f"New Person {i}", "birth": ""}])
+            finally:
+                done.set()
+
+        def queries():
+            while not done.is_set():
+                try:
+                    server.resolve("New Persn")
+                except RuntimeError as e:
+                    errors.append(e)
+                    return
+                except Exception:
+                    pass
+
+        threads = [threading.Thread(target=feed), threading.Thread(target=queries)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.close()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(server.resolve("New Person 1999"), "new1999")
+
+
+if __name__ == "__main__":
+    unittest.main()
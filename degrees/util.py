@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,38 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+def breadth_first_search(source, target, neighbors):
+    """
+    Returns the shortest list of (action, state) pairs that lead from
+    `source` to `target`, or None if there is no such path.
+
+    `neighbors(state)` yields the (action, state) pairs reachable from
+    a state. Each state is stored once, in a dict that maps it to the
+    (action, state) step it was reached through, so checking whether a
+    state has been seen takes constant time. The goal is tested as soon
+    as a state is generated rather than when it is dequeued, which saves
+    expanding the whole last layer.
+    """
+    if source == target:
+        return []
+
+    parents = {source: None}
+    frontier = deque([source])
+    while frontier:
+        state = frontier.popleft()
+        for action, child in neighbors(state):
+            if child in parents:
+                continue
+            parents[child] = (action, state)
+            if child == target:
+                path = []
+                while parents[child] is not None:
+                    action, parent = parents[child]
+                    path.append((action, child))
+                    child = parent
+                path.reverse()
+                return path
+            frontier.append(child)
+    return None
@@ -0,0 +1,108 @@
+"""
+Benchmark of the tic-tac-toe searches
+"""
+
+import argparse
+import math
+import time
+
+import tictactoe as ttt
+
+
+def full_search(board):
+    """
+    Returns the optimal action found by searching the whole game tree
+    with max_value and min_value, without pruning.
+    """
+    maximizing = ttt.player(board) == ttt.X
+    best_value = -math.inf if maximizing else math.inf
+    best_move = None
+    for action in ttt.actions(board):
+        if maximizing:
+            value = ttt.min_value(ttt.result(board, action))
+            if value > best_value:
+                best_value, best_move = value, action
+        else:
+            value = ttt.max_value(ttt.result(board, action))
+            if value < best_value:
+                best_value, best_move = value, action
+    return best_move
+
+
+def cold_search(board):
+    """
+    Returns the action found by alpha-beta search starting from an
+    empty transposition table.
+    """
+    solved = ttt.table
+    ttt.table = {}
+    try:
+        return ttt.search(board)
+    finally:
+        ttt.table = solved
+
+
+SEARCHES = {
+    "full": full_search,
+    "alphabeta": cold_search,
+    "table": ttt.minimax,
+}
+
+
+def game(opening):
+    """
+    Yields the positions of a game in which the first moves are
+    `opening` and both sides then play ttt.minimax.
+    """
+    board = ttt.initial_state()
+    for action in opening:
+        board = ttt.result(board, action)
+    while not ttt.terminal(board):
+        yield board
+        board = ttt.result(board, ttt.minimax(board))
+
+
+def run(search, board):
+    """
+    Returns the move chosen by `search`, the positions it visited and
+    the time it took.
+    """
+    ttt.nodes = 0
+    started = time.perf_counter()
+    move = search(board)
+    return move, ttt.nodes, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count nodes and time per move of tic-tac-toe searches.")
+    parser.add_argument("--searches", nargs="+", choices=sorted(SEARCHES), default=sorted(SEARCHES),
+                        help="searches to run (default: all)")
+    args = parser.parse_args()
+
+    openings = {
+        "empty": [],
+        "centre": [(1, 1)],
+        "corner": [(0, 0)],
+        "edge": [(0, 1)],
+    }
+
+    print(f"{'opening':<8} {'move':>4} {'search':<10} {'action':<8} {'nodes':>8} {'seconds':>9}")
+    totals = {name: [0, 0] for name in args.searches}
+    for name, opening in openings.items():
+        for number, board in enumerate(game(opening), len(opening) + 1):
+            optimal = ttt.value(*ttt.to_bits(board))
+            for search in args.searches:
+                move, nodes, seconds = run(SEARCHES[search], board)
+                if ttt.value(*ttt.to_bits(ttt.result(board, move))) != optimal:
+                    raise Exception(f"{search} chose a losing move {move}")
+                totals[search][0] += nodes
+                totals[search][1] += seconds
+                print(f"{name:<8} {number:>4} {search:<10} {str(move):<8} {nodes:>8} {seconds:>9.4f}")
+
+    print()
+    for search, (nodes, seconds) in totals.items():
+        print(f"{search:<10} {nodes:>10} nodes {seconds:>9.4f}s total")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,14 +17,21 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+clock = pygame.time.Clock()
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# Search for the computer's move, running while the window redraws
+thinker = None
+thinking_since = None
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if thinker is not None:
+                thinker.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -108,15 +115,19 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, shown after at least half a second
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if thinker is None:
+                thinker = ttt.Thinker(board)
+                thinking_since = time.time()
+            elif thinker.done and time.time() - thinking_since >= 0.5:
+                move = thinker.best
+                if move is None:
+                    # The search failed: play any move rather than stall
+                    print(f"Computer search failed: {thinker.error}")
+                    move = min(ttt.actions(board))
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+                thinker = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +152,9 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    if thinker is not None:
+                        thinker.cancel()
+                        thinker = None
 
     pygame.display.flip()
+    clock.tick(60)
@@ -3,19 +3,82 @@ Tic Tac Toe Player
 """
 
 import math
+import threading
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Centre first, then corners, then edges: the order in which moves
+# are most likely to be good
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
 
-def initial_state():
+# Evaluation of a won position in the depth-limited search, less the
+# number of marks on the board, so that quicker wins score higher
+WIN = 1000000
+
+# Number of positions visited by searches, for benchmarking
+nodes = 0
+
+# Kinds of transposition table entries: the exact value of a
+# position, or a lower or upper bound on it
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# The 8 rotations and reflections of the board, as the cell (in row
+# major order) that ends up in each cell
+SYMMETRIES = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8],
+    [6, 3, 0, 7, 4, 1, 8, 5, 2],
+    [8, 7, 6, 5, 4, 3, 2, 1, 0],
+    [2, 5, 8, 1, 4, 7, 0, 3, 6],
+    [2, 1, 0, 5, 4, 3, 8, 7, 6],
+    [6, 7, 8, 3, 4, 5, 0, 1, 2],
+    [0, 3, 6, 1, 4, 7, 2, 5, 8],
+    [8, 5, 2, 7, 4, 1, 6, 3, 0],
+]
+
+# Bitboards: one int per player, with bit cols * i + j set if the
+# player has a mark in cell (i, j), so 9 bits on the 3x3 board
+FULL = 0b111111111
+
+# Rows, columns and diagonals
+LINES = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+# Bits in the order of MOVE_ORDER, and the same order with each
+# possible killer move tried first
+MOVE_BITS = tuple(1 << (3 * i + j) for i, j in MOVE_ORDER)
+KILLER_ORDERS = {
+    killer: (killer,) + tuple(bit for bit in MOVE_BITS if bit != killer)
+    for killer in MOVE_BITS
+}
+KILLER_ORDERS[0] = MOVE_BITS
+
+# For each symmetry, the image of every 9-bit mask
+SYMMETRY_TABLES = [
+    [
+        sum(1 << cell for cell in range(9) if mask >> symmetry[cell] & 1)
+        for mask in range(1 << 9)
+    ]
+    for symmetry in SYMMETRIES
+]
+
+# Maps canonical board encodings to (value, kind) entries
+table = {}
+
+# Maps (rows, cols, length) to the Geometry of that game
+geometries = {}
+
+
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
@@ -56,7 +119,7 @@ def result(board, action):
     i, j = action
 
     # Check if the action is within the valid range
-    if not (0 <= i < 3 and 0 <= j < 3):
+    if not (0 <= i < len(board) and 0 <= j < len(board[0])):
         raise ValueError("Action is out of bounds.")
 
     # Check if the cell is already occupied
@@ -73,34 +136,26 @@ def result(board, action):
     return new_board
 
 
-def winner(board):
+def winner(board, length=3):
     """
-    Returns the winner of the game, if there is one.
+    Returns the winner of the game, if there is one, when `length`
+    marks in a row win.
     """
-    # Check rows
-    for row in board:
-        if row[0] == row[1] == row[2] and row[0] is not None:
-            return row[0]
-
-    # Check columns
-    for i in range(3):
-        if board[0][i] == board[1][i] == board[2][i] and board[0][i] is not None:
-            return board[0][i]
-
-    # Check diagonals
-    if board[0][0] == board[1][1] == board[2][2] and board[0][0] is not None:
-        return board[0][0]
-    if board[0][2] == board[1][1] == board[2][0] and board[0][2] is not None:
-        return board[0][2]
+    x, o = to_bits(board)
+    for line in geometry(len(board), len(board[0]), length).lines:
+        if x & line == line:
+            return X
+        if o & line == line:
+            return O
 
     return None
 
 
-def terminal(board):
+def terminal(board, length=3):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None:
+    if winner(board, length) is not None:
         return True
     for row in board:
         for cell in row:
@@ -109,11 +164,11 @@ def terminal(board):
     return True
 
 
-def utility(board):
+def utility(board, length=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    win = winner(board)
+    win = winner(board, length)
     if win == X:
         return 1
     elif win == O:
@@ -126,6 +181,8 @@ def max_value(board):
     """
     Returns the maximum utility value that can be achieved from the given board state.
     """
+    global nodes
+    nodes += 1
     if terminal(board):
         return utility(board)
     v = -math.inf
@@ -138,6 +195,8 @@ def min_value(board):
     """
     Returns the minimum utility value that can be achieved from the given board state.
     """
+    global nodes
+    nodes += 1
     if terminal(board):
         return utility(board)
     v = math.inf
@@ -146,28 +205,520 @@ def min_value(board):
     return v
 
 
-def minimax(board):
+def to_bits(board):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the (x, o) bitboards of a board.
+    """
+    cols = len(board[0])
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (cols * i + j)
+            elif cell == O:
+                o |= 1 << (cols * i + j)
+    return x, o
+
+
+def from_bits(x, o, rows=3, cols=3):
+    """
+    Returns the board with the marks of the (x, o) bitboards.
+    """
+    return [
+        [
+            X if x >> (cols * i + j) & 1 else O if o >> (cols * i + j) & 1 else EMPTY
+            for j in range(cols)
+        ]
+        for i in range(rows)
+    ]
+
+
+def to_action(bit, cols=3):
+    """
+    Returns the (i, j) action of a single-bit move.
+    """
+    return divmod(bit.bit_length() - 1, cols)
+
+
+def has_line(bits):
+    """
+    Returns True if the marks in `bits` include a whole line.
+    """
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def canonical(x, o):
+    """
+    Returns an integer that encodes the position, with the O bitboard
+    above the X bitboard, taking the smallest encoding over all
+    symmetries so that equivalent boards share one key.
+    """
+    key = 1 << 18
+    for image in SYMMETRY_TABLES:
+        encoding = image[x] | image[o] << 9
+        if encoding < key:
+            key = encoding
+    return key
+
+
+def alphabeta(x, o, alpha, beta, killers):
+    """
+    Returns the utility of the position with X's marks in `x` and O's
+    in `o` with optimal play, as max_value and min_value do, as long
+    as it lies between alpha and beta. Otherwise returns a bound beyond
+    alpha or beta.
+
+    Lines that cannot change the result are pruned. `killers` holds,
+    for each number of marks on the board, the last move that caused a
+    cutoff there, which is tried first in sibling positions. Results
+    are kept in the transposition table, so positions reached again
+    through another move order or as a rotation or reflection are not
+    searched twice. Moves are made by OR-ing a bit into a bitboard, so
+    no boards are copied.
+    """
+    global nodes
+    nodes += 1
+    key = canonical(x, o)
+    entry = table.get(key)
+    if entry is not None:
+        value, kind = entry
+        if kind == EXACT:
+            return value
+        if kind == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    if has_line(x):
+        table[key] = (1, EXACT)
+        return 1
+    if has_line(o):
+        table[key] = (-1, EXACT)
+        return -1
+    taken = x | o
+    if taken == FULL:
+        table[key] = (0, EXACT)
+        return 0
+
+    window = (alpha, beta)
+    ply = taken.bit_count()
+    maximizing = ply % 2 == 0
+    v = -math.inf if maximizing else math.inf
+    for bit in KILLER_ORDERS[killers[ply]]:
+        if taken & bit:
+            continue
+        if maximizing:
+            v = max(v, alphabeta(x | bit, o, alpha, beta, killers))
+            alpha = max(alpha, v)
+        else:
+            v = min(v, alphabeta(x, o | bit, alpha, beta, killers))
+            beta = min(beta, v)
+        if alpha >= beta:
+            killers[ply] = bit
+            break
+
+    if v <= window[0]:
+        table[key] = (v, UPPER)
+    elif v >= window[1]:
+        table[key] = (v, LOWER)
+    else:
+        table[key] = (v, EXACT)
+    return v
+
+
+def search(board):
+    """
+    Returns the optimal action for the current player on the board,
+    found by alpha-beta search.
     """
     if terminal(board):
         return None
 
-    if player(board) == X:
-        v = -math.inf
-        best_move = None
-        for action in actions(board):
-            min_val = min_value(result(board, action))
-            if min_val > v:
-                v = min_val
-                best_move = action
-    else:
-        v = math.inf
-        best_move = None
-        for action in actions(board):
-            max_val = max_value(result(board, action))
-            if max_val < v:
-                v = max_val
-                best_move = action
-
-    return best_move
\ No newline at end of file
+    x, o = to_bits(board)
+    killers = [0] * 10
+    maximizing = player(board) == X
+    alpha = -math.inf
+    beta = math.inf
+    best_move = None
+    for bit in MOVE_BITS:
+        if (x | o) & bit:
+            continue
+        if maximizing:
+            v = alphabeta(x | bit, o, alpha, beta, killers)
+            if v > alpha:
+                alpha = v
+                best_move = bit
+        else:
+            v = alphabeta(x, o | bit, alpha, beta, killers)
+            if v < beta:
+                beta = v
+                best_move = bit
+
+    return to_action(best_move)
+
+
+def value(x, o):
+    """
+    Returns the exact utility of the position with optimal play, from
+    the transposition table if it is there.
+    """
+    global nodes
+    nodes += 1
+    entry = table.get(canonical(x, o))
+    if entry is not None and entry[1] == EXACT:
+        return entry[0]
+    return alphabeta(x, o, -math.inf, math.inf, [0] * 10)
+
+
+def solve():
+    """
+    Fills the transposition table with the exact value of every
+    position that can be reached in a game, so that every later move
+    is a table lookup. Only about 800 positions are distinct up to
+    symmetry.
+    """
+    def visit(x, o):
+        key = canonical(x, o)
+        if key not in table or table[key][1] != EXACT:
+            taken = x | o
+            if has_line(x):
+                best = 1
+            elif has_line(o):
+                best = -1
+            elif taken == FULL:
+                best = 0
+            elif taken.bit_count() % 2 == 0:
+                best = max(visit(x | bit, o) for bit in MOVE_BITS if not taken & bit)
+            else:
+                best = min(visit(x, o | bit) for bit in MOVE_BITS if not taken & bit)
+            table[key] = (best, EXACT)
+        return table[key][0]
+
+    visit(0, 0)
+
+
+def lines(rows, cols, length):
+    """
+    Returns the masks of every run of `length` cells along a row,
+    column or diagonal of a board with `rows` rows and `cols` columns.
+    """
+    masks = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if 0 <= i + di * (length - 1) < rows and 0 <= j + dj * (length - 1) < cols:
+                    masks.append(sum(
+                        1 << (cols * (i + di * step) + j + dj * step) for step in range(length)
+                    ))
+    return tuple(masks)
+
+
+class Geometry():
+    """
+    Masks and tables for an m,n,k-game: a board with `rows` rows and
+    `cols` columns on which `length` marks in a row win.
+    """
+
+    def __init__(self, rows, cols, length):
+        self.rows = rows
+        self.cols = cols
+        self.length = length
+        self.full = (1 << (rows * cols)) - 1
+        self.lines = lines(rows, cols, length)
+
+        # Lines through each cell, and the cells that share a line
+        # with it
+        self.through = [
+            tuple(line for line in self.lines if line >> cell & 1)
+            for cell in range(rows * cols)
+        ]
+        self.around = []
+        for cell in range(rows * cols):
+            around = 1 << cell
+            for line in self.through[cell]:
+                around |= line
+            self.around.append(around)
+
+        # Cells from the centre outwards, as (bit, cell) pairs
+        centre = ((rows - 1) / 2, (cols - 1) / 2)
+        self.order = tuple(
+            (1 << cell, cell)
+            for cell in sorted(range(rows * cols), key=lambda cell: (
+                max(abs(cell // cols - centre[0]), abs(cell % cols - centre[1])), cell
+            ))
+        )
+
+        # Worth of a line holding `n` marks of one player and none of
+        # the other's: a line one mark short of winning is a threat
+        self.weights = [0] + [8 ** n for n in range(1, length)]
+
+    def evaluate(self, x, o):
+        """
+        Returns the threat count score of a position: the worth of the
+        lines still open to X less the worth of those open to O.
+        """
+        score = 0
+        for line in self.lines:
+            if not o & line:
+                score += self.weights[(x & line).bit_count()]
+            elif not x & line:
+                score -= self.weights[(o & line).bit_count()]
+        return score
+
+    def gain(self, mine, theirs, cell):
+        """
+        Returns how much the score of the player with marks `mine`
+        rises if they play on `cell`, or WIN if the move wins. Only the
+        lines through the cell change, so the score is kept up to date
+        move by move instead of being recomputed.
+        """
+        total = 0
+        for line in self.through[cell]:
+            if theirs & line:
+                # The move closes a line that only the opponent held
+                if not mine & line:
+                    total += self.weights[(theirs & line).bit_count()]
+                continue
+            n = (mine & line).bit_count() + 1
+            if n == self.length:
+                return WIN
+            total += self.weights[n] - self.weights[n - 1]
+        return total
+
+
+def geometry(rows, cols, length):
+    """
+    Returns the Geometry of a board with `rows` rows and `cols`
+    columns on which `length` marks in a row win.
+    """
+    key = (rows, cols, length)
+    if key not in geometries:
+        geometries[key] = Geometry(*key)
+    return geometries[key]
+
+
+class Timeout(Exception):
+    """
+    Raised inside a Search when it runs out of time or is stopped.
+    """
+
+
+class Search():
+    """
+    Iterative-deepening alpha-beta search for boards too large to
+    solve.
+
+    Each iteration searches one move deeper than the last and scores
+    the positions at its horizon by their threat count. Results are
+    kept in a transposition table, and the best move it stores for a
+    position in one iteration is tried first in the next, so the
+    deeper searches prune well. Only cells that share a line with a
+    mark are considered, as the others touch no line in play, and they
+    are tried in the order of how much they raise the score, which puts
+    winning and blocking moves first.
+
+    `length` marks in a row win, and the search stops after `budget`
+    seconds or once the `stop` event is set.
+    """
+
+    def __init__(self, board, length=3, budget=1.0, stop=None):
+        self.geometry = geometry(len(board), len(board[0]), length)
+        self.x, self.o = to_bits(board)
+        self.deadline = time.perf_counter() + budget
+        self.stop = stop
+        self.table = {}
+        self.nodes = 0
+        self.completed = False
+
+    def alphabeta(self, x, o, score, around, depth, alpha, beta):
+        """
+        Returns the value of the position searched `depth` moves deep
+        if it lies between alpha and beta, and otherwise a bound beyond
+        them, with `score` the threat count of the position and
+        `around` the cells that share a line with its marks.
+        """
+        global nodes
+        nodes += 1
+        self.nodes += 1
+        if self.completed and self.nodes % 1024 == 0:
+            if time.perf_counter() > self.deadline or self.stop is not None and self.stop.is_set():
+                raise Timeout
+
+        geometry = self.geometry
+        taken = x | o
+        if taken == geometry.full:
+            return 0
+        if depth == 0:
+            return score
+
+        key = (x, o)
+        entry = self.table.get(key)
+        hint = 0
+        if entry is not None:
+            entry_depth, value, kind, hint = entry
+            if entry_depth >= depth:
+                if kind == EXACT:
+                    return value
+                if kind == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        if not taken:
+            # The first mark goes in the centre
+            candidates = geometry.order[0][0]
+        else:
+            candidates = around & ~taken or geometry.full & ~taken
+        maximizing = taken.bit_count() % 2 == 0
+        mine, theirs = (x, o) if maximizing else (o, x)
+        moves = sorted(
+            (
+                (bit == hint, geometry.gain(mine, theirs, cell), bit, cell)
+                for bit, cell in geometry.order
+                if candidates & bit
+            ),
+            reverse=True
+        )
+
+        window = (alpha, beta)
+        v = -math.inf if maximizing else math.inf
+        best = 0
+        for _, gain, bit, cell in moves:
+            if gain == WIN:
+                # Nothing is better than winning now
+                v = WIN - taken.bit_count() - 1 if maximizing else taken.bit_count() + 1 - WIN
+                best = bit
+                break
+            if maximizing:
+                child = self.alphabeta(x | bit, o, score + gain, around | geometry.around[cell],
+                                       depth - 1, alpha, beta)
+                if child > v:
+                    v, best = child, bit
+                alpha = max(alpha, v)
+            else:
+                child = self.alphabeta(x, o | bit, score - gain, around | geometry.around[cell],
+                                       depth - 1, alpha, beta)
+                if child < v:
+                    v, best = child, bit
+                beta = min(beta, v)
+            if alpha >= beta:
+                break
+
+        if v <= window[0]:
+            self.table[key] = (depth, v, UPPER, best)
+        elif v >= window[1]:
+            self.table[key] = (depth, v, LOWER, best)
+        else:
+            self.table[key] = (depth, v, EXACT, best)
+        return v
+
+    def deepen(self):
+        """
+        Yields (depth, action, value) each time an iteration finishes,
+        until the time runs out, the `stop` event is set, the game is
+        decided or the board is searched to the end. The first iteration always finishes.
+        """
+        geometry = self.geometry
+        x, o = self.x, self.o
+        around = 0
+        for bit, cell in geometry.order:
+            if (x | o) & bit:
+                around |= geometry.around[cell]
+        score = geometry.evaluate(x, o)
+        empty = (geometry.full & ~(x | o)).bit_count()
+
+        for depth in range(1, empty + 1):
+            try:
+                value = self.alphabeta(x, o, score, around, depth, -math.inf, math.inf)
+            except Timeout:
+                return
+            self.completed = True
+            yield depth, to_action(self.table[(x, o)][3], geometry.cols), value
+            if abs(value) >= WIN - geometry.rows * geometry.cols:
+                return
+
+
+def minimax(board, length=3, budget=1.0):
+    """
+    Returns the optimal action for the current player on the board.
+    On boards other than the 3x3 game with three in a row, returns the
+    best action found by a Search within `budget` seconds.
+    """
+    if terminal(board, length):
+        return None
+
+    if (len(board), len(board[0]), length) != (3, 3, 3):
+        action = None
+        for _, action, _ in Search(board, length, budget).deepen():
+            pass
+        return action
+
+    x, o = to_bits(board)
+    maximizing = player(board) == X
+    best_value = None
+    best_move = None
+    for bit in MOVE_BITS:
+        if (x | o) & bit:
+            continue
+        v = value(x | bit, o) if maximizing else value(x, o | bit)
+        if best_value is None or (v > best_value if maximizing else v < best_value):
+            best_value = v
+            best_move = bit
+
+    return to_action(best_move)
+
+
+class Thinker():
+    """
+    Finds the computer's move on a worker thread, so that a game loop
+    can keep running while it searches.
+
+    `best` is the best action found so far, improved after each
+    iteration of a Search, and `done` is True once it is final. If the
+    search fails, `done` is still set and `error` holds the exception,
+    with `best` None if no move was found. The search can be abandoned
+    with cancel(), for example when the game is reset. `length` and
+    `budget` are passed on to the Search.
+    """
+
+    def __init__(self, board, length=3, budget=1.0):
+        self.board = board
+        self.length = length
+        self.budget = budget
+        self.best = None
+        self.depth = 0
+        self.done = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            if (len(self.board), len(self.board[0]), self.length) == (3, 3, 3):
+                self.best = minimax(self.board)
+            else:
+                search = Search(self.board, self.length, self.budget, self.cancelled)
+                for depth, action, _ in search.deepen():
+                    self.best = action
+                    self.depth = depth
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = not self.cancelled.is_set()
+
+    def cancel(self):
+        """
+        Stops the search. `done` stays False.
+        """
+        self.cancelled.set()
+
+
+solve()